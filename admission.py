@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import INFERENCE_ACTIVE, INFERENCE_REJECTED, INFERENCE_WAITING, record_stage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Slot inferensi tidak tersedia; controller merespons 503 dengan Retry-After."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Membatasi jumlah inferensi yang berjalan bersamaan dalam satu worker.
+
+    Request interaktif yang tidak mendapat slot menunggu di antrian terbatas
+    (max_queue) paling lama queue_timeout detik; bila antrian penuh atau waktu
+    tunggu habis, Overloaded dilempar agar request langsung dijawab 503 daripada
+    ikut memperlambat inferensi yang sedang berjalan. Pekerjaan latar belakang
+    (job asinkron, batch) menunggu tanpa batas waktu dan tidak memakai kuota antrian.
+    """
+
+    def __init__(self, max_concurrent=2, max_queue=16, queue_timeout=10.0, retry_after=2):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+
+    def _publish(self):
+        INFERENCE_ACTIVE.set(self._active)
+        INFERENCE_WAITING.set(self._waiting)
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+    def is_saturated(self):
+        # Pemeriksaan cepat sebelum decode: semua slot terpakai dan antrian penuh
+        with self._condition:
+            return self._active >= self.max_concurrent and self._waiting >= self.max_queue
+
+    def check_backlog(self, depth, limit, background=False):
+        # Untuk antrian yang memakai slot per batch (micro-batcher): request interaktif
+        # ditolak berdasarkan panjang antrian, bukan dengan menunggu slot sendiri
+        if not background and depth >= limit:
+            self._reject('queue_full', "Server sedang sibuk, coba lagi sebentar lagi")
+
+    def reject_timeout(self):
+        # Juga dipakai micro-batcher bila gambar belum diproses saat queue_timeout habis
+        self._reject('timeout', "Waktu tunggu antrian inferensi habis")
+
+    def _reject(self, reason, message):
+        INFERENCE_REJECTED.inc(reason)
+        raise Overloaded(message, self.retry_after)
+
+    def acquire(self, background=False):
+        start = time.perf_counter()
+        with self._condition:
+            if self._active >= self.max_concurrent:
+                if not background and self._waiting >= self.max_queue:
+                    self._reject('queue_full', "Server sedang sibuk, coba lagi sebentar lagi")
+                deadline = None if background else time.monotonic() + self.queue_timeout
+                if not background:
+                    self._waiting += 1
+                    self._publish()
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.reject_timeout()
+                        self._condition.wait(remaining)
+                finally:
+                    if not background:
+                        self._waiting -= 1
+            self._active += 1
+            self._publish()
+        record_stage('admission_wait', time.perf_counter() - start)
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._publish()
+            # Semua penunggu dibangunkan: penunggu yang sudah habis waktunya tidak memakai slot,
+            # sehingga notify() tunggal bisa membiarkan slot kosong sementara yang lain tetap menunggu
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, background=False):
+        self.acquire(background)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission_controller(config):
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = AdmissionController(
+                max_concurrent=config['INFERENCE_MAX_CONCURRENT'],
+                max_queue=config['INFERENCE_MAX_QUEUE'],
+                queue_timeout=config['INFERENCE_QUEUE_TIMEOUT'],
+                retry_after=config['INFERENCE_RETRY_AFTER']
+            )
+        return _admission
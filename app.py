@@ -1,11 +1,13 @@
 from flask import Flask, render_template, redirect, url_for
 from config import Config
+from database import engine_options, get_user_cache, load_cached
 from extensions import db, login_manager
 from models import Users
 from flask_login import login_required, current_user
 
 app = Flask(__name__)
 app.config.from_object(Config)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
 
 db.init_app(app)
 login_manager.init_app(app)
@@ -14,14 +16,19 @@ login_manager.login_view = 'auth.login'
 from controllers.auth_controller import auth as auth_blueprint
 from controllers.image_controller import images as images_blueprint
 from controllers.api_controller import captioning as captioning_blueprint
+from controllers.metrics_controller import metrics as metrics_blueprint
+from controllers.media_controller import media as media_blueprint
 
 app.register_blueprint(auth_blueprint)
 app.register_blueprint(images_blueprint)
 app.register_blueprint(captioning_blueprint)
+app.register_blueprint(metrics_blueprint)
+app.register_blueprint(media_blueprint)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return Users.query.get(int(user_id))
+    # Dipanggil di setiap request login_required; cache TTL menghindari query Users berulang
+    return load_cached(db.session, Users, get_user_cache(app.config), int(user_id))
 
 @app.route('/')
 def index():
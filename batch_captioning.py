@@ -0,0 +1,191 @@
+import logging
+import os
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from admission import get_admission_controller
+from batcher import decode_options
+from caption_cache import get_caption_cache
+from feature_cache import feature_key, get_feature_cache
+from ingest import IngestedImage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+class BatchLimitError(ValueError):
+    pass
+
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _is_image_member(name):
+    base = os.path.basename(name)
+    # Lewati metadata macOS dan file tersembunyi di dalam arsip
+    if not base or base.startswith('.') or '__MACOSX/' in name:
+        return False
+    return os.path.splitext(base)[1].lower() in IMAGE_EXTENSIONS
+
+
+def iter_archive(stream, filename, max_image_bytes):
+    """Menghasilkan (nama, byte) untuk setiap gambar di arsip zip/tar tanpa mengekstrak ke disk.
+
+    Ukuran setiap anggota diperiksa dari header arsip sebelum dibaca, sehingga
+    zip bomb ditolak sebelum memakan memori.
+    """
+    if filename.lower().endswith('.zip'):
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _is_image_member(info.filename):
+                    continue
+                if info.file_size > max_image_bytes:
+                    yield info.filename, BatchLimitError("Ukuran gambar melebihi batas")
+                    continue
+                yield info.filename, archive.read(info)
+    else:
+        with tarfile.open(fileobj=stream, mode='r:*') as archive:
+            for member in archive:
+                if not member.isfile() or not _is_image_member(member.name):
+                    continue
+                if member.size > max_image_bytes:
+                    yield member.name, BatchLimitError("Ukuran gambar melebihi batas")
+                    continue
+                yield member.name, archive.extractfile(member).read()
+
+
+def iter_uploads(files, max_files, max_bytes, max_image_bytes):
+    """Menggabungkan file biasa dan isi arsip menjadi satu aliran (nama, byte atau error).
+
+    Batas jumlah gambar dan total byte dihitung atas seluruh request.
+    """
+    count = 0
+    total_bytes = 0
+    for file in files:
+        if is_archive(file.filename):
+            members = iter_archive(file.stream, file.filename, max_image_bytes)
+        else:
+            data = file.read()
+            members = [(file.filename, BatchLimitError("Ukuran gambar melebihi batas")
+                        if len(data) > max_image_bytes else data)]
+        for name, data in members:
+            if count >= max_files:
+                raise BatchLimitError(f"Jumlah gambar melebihi batas {max_files}")
+            if not isinstance(data, Exception):
+                total_bytes += len(data)
+                if total_bytes > max_bytes:
+                    raise BatchLimitError("Total ukuran gambar melebihi batas")
+            count += 1
+            yield name, data
+
+
+class BatchCaptioner:
+    """Captioning banyak gambar dalam batch sungguhan, hasil dialirkan per potongan.
+
+    Gambar di-decode paralel oleh pool thread (decoder PIL melepas GIL) sementara
+    potongan sebelumnya diproses model; setiap potongan menjalankan satu ekstraksi
+    fitur ResNet50V2 dan satu beam search untuk seluruh gambarnya.
+    """
+
+    def __init__(self, config):
+        self.batch_size = config['BATCH_CAPTION_SIZE']
+        self.max_side = config['CAPTION_DECODE_SIDE']
+        self.max_pixels = config['IMAGE_MAX_PIXELS']
+        self.decode_workers = config['BATCH_DECODE_WORKERS']
+        self.caption_cache = get_caption_cache(config)
+        self.feature_cache = get_feature_cache(config)
+        self.admission = get_admission_controller(config)
+        self.decode_options = decode_options(config)
+
+    def _prepare(self, index, name, data):
+        result = {'index': index, 'filename': name}
+        if isinstance(data, Exception):
+            result['error'] = str(data)
+            return result, None
+        image = IngestedImage(data, filename=name, max_side=self.max_side, max_pixels=self.max_pixels)
+        try:
+            cached = self.caption_cache.get(data) if self.caption_cache else None
+            if cached:
+                result['caption'] = cached['caption']
+                result['cached'] = True
+                return result, None
+            features = self.feature_cache.get(feature_key(image)) if self.feature_cache else None
+            # Tensor model hanya dibuat bila fitur belum ada di cache
+            tensor = image.model_tensor() if features is None else None
+        except Exception as e:
+            # File rusak cukup menggagalkan gambar itu sendiri, bukan seluruh batch
+            result['error'] = str(e)
+            return result, None
+        return result, (feature_key(image), tensor, features)
+
+    def _caption_chunk(self, chunk):
+        pending = [(result, work) for result, work in chunk if work is not None]
+        try:
+            # Batch menunggu slot inferensi yang sama dengan request interaktif
+            with self.admission.slot(background=True):
+                self._caption_pending(pending)
+        except Exception as e:
+            logger.error(f"Kesalahan saat memproses batch caption: {str(e)}")
+            for result, _ in pending:
+                result['error'] = str(e)
+        return [result for result, _ in chunk]
+
+    def _caption_pending(self, pending):
+        from inference import caption_features, extract_features
+
+        if pending:
+            missing = [i for i, (_, (_, tensor, _)) in enumerate(pending) if tensor is not None]
+            extracted = {}
+            if missing:
+                tensors = np.concatenate([pending[i][1][1] for i in missing], axis=0)
+                extracted = dict(zip(missing, extract_features(tensors).numpy()))
+                if self.feature_cache:
+                    for i in missing:
+                        self.feature_cache.put(pending[i][1][0], extracted[i])
+            features = np.stack([extracted[i] if i in extracted else work[2]
+                                 for i, (_, work) in enumerate(pending)])
+            captions = caption_features(features, **self.decode_options)
+            for (result, _), caption in zip(pending, captions):
+                result['caption'] = ' '.join([word for word in caption if word != "<unk>"])
+
+    def run(self, items):
+        """items: iterable (nama, byte atau error). Menghasilkan satu dict hasil per gambar."""
+        with ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix='batch-decode') as executor:
+            futures = []
+            limit_error = None
+            try:
+                for index, (name, data) in enumerate(items):
+                    futures.append(executor.submit(self._prepare, index, name, data))
+                    # Paling banyak dua potongan yang sudah di-decode menunggu di memori
+                    if len(futures) >= 2 * self.batch_size:
+                        chunk, futures = futures[:self.batch_size], futures[self.batch_size:]
+                        yield from self._caption_chunk([future.result() for future in chunk])
+            except BatchLimitError as e:
+                # Gambar yang sudah diterima sebelum batas terlampaui tetap diproses
+                limit_error = e
+            while futures:
+                chunk, futures = futures[:self.batch_size], futures[self.batch_size:]
+                yield from self._caption_chunk([future.result() for future in chunk])
+            if limit_error:
+                raise limit_error
+
+
+_batch_slots = None
+_batch_slots_lock = threading.Lock()
+
+
+def get_batch_slots(config):
+    # Membatasi jumlah request batch yang berjalan bersamaan per worker
+    global _batch_slots
+    with _batch_slots_lock:
+        if _batch_slots is None:
+            _batch_slots = threading.BoundedSemaphore(config['BATCH_MAX_CONCURRENT'])
+        return _batch_slots
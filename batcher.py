@@ -0,0 +1,191 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+from flask import current_app
+
+from admission import get_admission_controller
+from feature_cache import get_feature_cache
+from metrics import timed
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CaptionBatcher:
+    """Mengumpulkan gambar dari request yang berjalan bersamaan menjadi satu batch.
+
+    Thread pekerja menunggu gambar pertama, lalu menampung gambar berikutnya sampai
+    max_batch_size tercapai atau max_wait_ms habis. Ekstraksi fitur ResNet dan beam
+    search dijalankan sekali untuk seluruh batch dan setiap caption dikembalikan ke
+    request yang menunggunya.
+
+    Bila admission diberikan, pekerja mengambil satu slot inferensi per batch (bukan
+    per request), sehingga batch dapat terisi sampai max_batch_size; request
+    interaktif ditolak (Overloaded) bila antrian sudah berisi max_queue gambar.
+    """
+
+    def __init__(self, max_batch_size=8, max_wait_ms=10, beam_width=3, admission=None, max_queue=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.beam_width = beam_width
+        self.admission = admission
+        self.max_queue = max_queue
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='caption-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, image_tensor, features=None, options=None, background=False):
+        # Future menghasilkan (caption, grid fitur 49 x 2048); grid fitur yang sudah
+        # ada (misalnya dari cache fitur) tidak diekstrak ulang oleh ResNet. options
+        # adalah argumen decoding (lihat decode_options)
+        if self.admission and self.max_queue is not None:
+            self.admission.check_backlog(self._queue.qsize(), self.max_queue, background)
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((image_tensor, features, future, tuple(sorted((options or {}).items()))))
+        return future
+
+    def caption(self, image_tensor, timeout=None):
+        caption, _ = self.submit(image_tensor).result(timeout=timeout)
+        return caption
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Gambar dengan opsi decoding yang sama dijalankan dalam satu beam search
+            groups = {}
+            for item in self._collect():
+                groups.setdefault(item[3], []).append(item)
+            for options, group in groups.items():
+                if self.admission:
+                    with self.admission.slot(background=True):
+                        self._caption_group(group, dict(options))
+                else:
+                    self._caption_group(group, dict(options))
+
+    def _caption_group(self, batch, options):
+        # Future yang dibatalkan pemanggil (waktu tunggu habis) sebelum mendapat slot dilewati
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if batch:
+            self._run_group(batch, options)
+
+    def _run_group(self, batch, options):
+        from inference import caption_features, extract_features
+
+        futures = [item[2] for item in batch]
+        try:
+            missing = [i for i, item in enumerate(batch) if item[1] is None]
+            if missing:
+                extracted = extract_features(np.concatenate([batch[i][0] for i in missing], axis=0)).numpy()
+                extracted = dict(zip(missing, extracted))
+            features = np.stack([extracted[i] if item[1] is None else item[1] for i, item in enumerate(batch)])
+            captions = caption_features(features, self.beam_width, **options)
+        except Exception as e:
+            logger.error(f"Kesalahan saat memproses batch caption: {str(e)}")
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, caption, image_features in zip(futures, captions, features):
+            future.set_result((caption, image_features))
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher(config):
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = CaptionBatcher(
+                max_batch_size=config['CAPTION_MAX_BATCH_SIZE'],
+                max_wait_ms=config['CAPTION_MAX_WAIT_MS'],
+                admission=get_admission_controller(config),
+                # Satu batch penuh yang sedang dikumpulkan ditambah kuota antrian biasa
+                max_queue=config['INFERENCE_MAX_QUEUE'] + config['CAPTION_MAX_BATCH_SIZE']
+            )
+        return _batcher
+
+
+def decode_options(config, overrides=None):
+    """Argumen decoding untuk caption_features: default dari config, ditimpa per request."""
+    options = {
+        'max_length': config['MAX_CAPTION_LENGTH'],
+        'repetition_ngram': config['CAPTION_REPETITION_NGRAM'],
+        'end_threshold': config['CAPTION_END_THRESHOLD'],
+    }
+    options.update(overrides or {})
+    return options
+
+
+def generate_caption(image_tensor, cache_key=None, background=False, options=None, features=None,
+                     on_admitted=None):
+    """Menghasilkan caption (list kata) untuk satu gambar, lewat batcher bila diaktifkan.
+
+    Bila cache_key (feature_key gambar) diberikan dan cache fitur aktif, grid fitur
+    ResNet diambil dari cache atau disimpan ke sana setelah diekstrak. Inferensi
+    berjalan di dalam slot admission control (per batch bila CAPTION_BATCHING aktif);
+    request interaktif dapat menerima Overloaded, sedangkan pekerjaan latar belakang
+    (background=True) menunggu. Di micro-batcher, gambar interaktif yang belum
+    mendapat slot setelah INFERENCE_QUEUE_TIMEOUT dibatalkan dan menjadi Overloaded.
+    options menimpa argumen decoding default (lihat decode_options). Grid fitur
+    yang sudah dihitung pemanggil (features) dipakai langsung; image_tensor boleh None.
+    on_admitted dipanggil sekali setelah inferensi diterima admission control.
+    """
+    from inference import caption_features, extract_features
+
+    config = current_app.config
+    options = decode_options(config, options)
+    feature_cache = get_feature_cache(config) if cache_key and features is None else None
+    if feature_cache:
+        features = feature_cache.get(cache_key)
+    extracted = features is None
+
+    # 'model' mencakup waktu tunggu batch; tahap features/beam_search tercatat terpisah
+    with timed('model'):
+        if config['CAPTION_BATCHING']:
+            admission = get_admission_controller(config)
+            future = get_batcher(config).submit(image_tensor, features, options, background)
+            if on_admitted:
+                on_admitted()
+            try:
+                caption, features = future.result(timeout=None if background else admission.queue_timeout)
+            except FutureTimeoutError:
+                # Hanya gambar yang masih mengantri yang dapat dibatalkan; yang sedang
+                # diproses ditunggu sampai selesai seperti inferensi yang sudah mendapat slot
+                if future.cancel():
+                    admission.reject_timeout()
+                caption, features = future.result()
+        else:
+            with get_admission_controller(config).slot(background):
+                if on_admitted:
+                    on_admitted()
+                if features is None:
+                    features = extract_features(image_tensor).numpy()[0]
+                caption = caption_features(features[np.newaxis, ...], **options)[0]
+
+    if feature_cache and extracted:
+        feature_cache.put(cache_key, features)
+    return caption
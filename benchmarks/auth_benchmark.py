@@ -0,0 +1,110 @@
+"""Benchmark request terautentikasi GET /images dengan dan tanpa cache pengguna.
+
+Setiap request login_required memanggil user_loader Flask-Login; tanpa cache itu
+berarti satu query Users per request. Benchmark menjalankan sejumlah request dari
+beberapa thread (satu klien login per thread) dan melaporkan request per detik dan
+jumlah statement SQL per request. Database SQLite sementara dipakai kecuali
+BENCHMARK_DATABASE_URL diisi (misalnya MySQL staging). Jalankan dari root repo:
+
+    python benchmarks/auth_benchmark.py
+    BENCHMARK_DATABASE_URL=mysql+pymysql://root:@localhost/seeimg_bench python benchmarks/auth_benchmark.py --threads 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+
+def login_clients(app, threads):
+    clients = []
+    for _ in range(threads):
+        client = app.test_client()
+        client.post('/login', data={'username': 'benchmark', 'password': 'benchmark'})
+        clients.append(client)
+    return clients
+
+
+def run(clients, requests_per_thread, path):
+    errors = []
+
+    def worker(client):
+        for _ in range(requests_per_thread):
+            response = client.get(path)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    workers = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"{len(errors)} request gagal, status {sorted(set(errors))}")
+    return len(clients) * requests_per_thread / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help='request per thread')
+    parser.add_argument('--images', type=int, default=50, help='jumlah baris riwayat pengguna benchmark')
+    parser.add_argument('--path', default='/images?limit=20&fields=id,predicted_caption')
+    parser.add_argument('--ttl', type=float, default=Config.USER_CACHE_TTL or 30)
+    args = parser.parse_args()
+
+    # URI diganti sebelum app diimpor agar benchmark tidak pernah menulis ke database produksi
+    Config.SQLALCHEMY_DATABASE_URI = os.getenv(
+        'BENCHMARK_DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')}")
+    from sqlalchemy import event
+    from werkzeug.security import generate_password_hash
+
+    import database
+    from app import app
+    from extensions import db
+    from models import Images, Users
+
+    statements = [0]
+    with app.app_context():
+        db.create_all()
+        user = Users.query.filter_by(username='benchmark').first()
+        if user is None:
+            user = Users(username='benchmark', password=generate_password_hash('benchmark', method='pbkdf2:sha256'))
+            db.session.add(user)
+            db.session.commit()
+        user_id = user.id
+        Images.query.filter_by(user_id=user_id).delete()
+        db.session.add_all([Images(user_id=user_id, image_path=f'static/uploads/benchmark-{i}.webp',
+                                   predicted_caption='seekor kucing di atas meja') for i in range(args.images)])
+        db.session.commit()
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_statement(*_):
+            statements[0] += 1
+
+    print(f"{'cache pengguna':<16} {'req/detik':>10} {'SQL/request':>12}")
+    try:
+        for label, ttl in (('nonaktif', 0), (f'TTL {args.ttl:g} detik', args.ttl)):
+            app.config['USER_CACHE_TTL'] = ttl
+            database._user_cache = None
+            clients = login_clients(app, args.threads)
+            run(clients, 5, args.path)  # pemanasan: pool koneksi dan cache
+            statements[0] = 0
+            rate = run(clients, args.requests, args.path)
+            per_request = statements[0] / (args.threads * args.requests)
+            print(f"{label:<16} {rate:>10.1f} {per_request:>12.2f}")
+    finally:
+        with app.app_context():
+            Images.query.filter_by(user_id=user_id).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
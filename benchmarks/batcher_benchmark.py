@@ -0,0 +1,75 @@
+"""Benchmark throughput dan latensi p50/p99 caption terhadap jumlah request bersamaan.
+
+Membandingkan pemanggilan langsung evaluate_beam_search (batch 1 per request)
+dengan CaptionBatcher. Jalankan dari root repo:
+
+    python benchmarks/batcher_benchmark.py --concurrency 1 2 4 8 16 --requests 64
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batcher import CaptionBatcher  # noqa: E402
+from inference import evaluate_beam_search, load_image_from_file  # noqa: E402
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+def run(caption_fn, image_tensor, concurrency, total_requests):
+    def timed_request(_):
+        start = time.perf_counter()
+        caption_fn(image_tensor)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed_request, range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'throughput': total_requests / elapsed,
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', default='static/images/sample1.jpg')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--requests', type=int, default=32, help='jumlah request per level concurrency')
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    args = parser.parse_args()
+
+    with open(args.image, 'rb') as f:
+        image_tensor = load_image_from_file(f)
+
+    batcher = CaptionBatcher(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    modes = {
+        'direct': lambda tensor: evaluate_beam_search(tensor)[0],
+        'batched': batcher.caption,
+    }
+
+    # Pemanasan agar waktu tracing/alokasi pertama tidak ikut terukur
+    for caption_fn in modes.values():
+        caption_fn(image_tensor)
+
+    print(f"{'mode':<8} {'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for concurrency in args.concurrency:
+        for name, caption_fn in modes.items():
+            result = run(caption_fn, image_tensor, concurrency, args.requests)
+            print(f"{name:<8} {concurrency:>5} {result['throughput']:>8.2f} "
+                  f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark cold start model: aset lama (pickle + .h5 + ImageNet) dibandingkan artifact model.
+
+Setiap percobaan berjalan di proses Python baru dan mengukur impor TensorFlow,
+pemuatan model (ModelRegistry.ensure_loaded), inferensi pertama (warm_up) dan RSS
+puncak. Dengan --drop-caches (Linux, root) page cache dikosongkan sebelum setiap
+percobaan sehingga file bobot benar-benar dibaca dari disk, dan --cold-keras-cache
+memakai KERAS_HOME kosong seperti container baru, sehingga sumber h5 harus
+mengunduh bobot ImageNet (atau gagal tanpa akses jaringan). Jalankan dari root repo:
+
+    python benchmarks/cold_start_benchmark.py
+    python benchmarks/cold_start_benchmark.py --runs 5 --drop-caches
+    python benchmarks/cold_start_benchmark.py --cold-keras-cache
+    python benchmarks/cold_start_benchmark.py --sources artifact --artifact /srv/seeimg/model
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+SOURCES = ('h5', 'artifact')
+
+
+def child(args):
+    # Dijalankan di proses baru: ukur dari awal impor TensorFlow sampai inferensi pertama
+    start = time.perf_counter()
+    import tensorflow  # noqa: F401
+
+    imported = time.perf_counter()
+    from model_registry import ModelRegistry
+
+    registry = ModelRegistry(weights_path=args.weights, tokenizer_path=args.tokenizer, backend=args.backend,
+                             max_caption_length=Config.MAX_CAPTION_LENGTH, resnet_weights=args.resnet_weights,
+                             artifact_dir=args.artifact if args.child == 'artifact' else None)
+    registry.ensure_loaded()
+    loaded = time.perf_counter()
+    registry.warm_up()
+    ready = time.perf_counter()
+    print(json.dumps({
+        'import': imported - start,
+        'load': loaded - imported,
+        'first_inference': ready - loaded,
+        'total': ready - start,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def drop_caches():
+    os.sync()
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+
+def run_child(source, args):
+    command = [sys.executable, os.path.abspath(__file__), '--child', source, '--weights', args.weights,
+               '--tokenizer', args.tokenizer, '--resnet-weights', args.resnet_weights, '--artifact', args.artifact,
+               '--backend', args.backend]
+    with tempfile.TemporaryDirectory(prefix='keras-cold-') as keras_home:
+        env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+        if args.cold_keras_cache:
+            env['KERAS_HOME'] = keras_home
+        result = subprocess.run(command, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'proses gagal')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--sources', default=','.join(SOURCES), help='daftar sumber dipisah koma: h5, artifact')
+    parser.add_argument('--weights', default='./assets/model.weights.h5')
+    parser.add_argument('--tokenizer', default='./assets/tokenizer.pickle')
+    parser.add_argument('--resnet-weights', default='imagenet')
+    parser.add_argument('--artifact', default=Config.MODEL_ARTIFACT_DIR or 'assets/model_artifact')
+    parser.add_argument('--backend', default='eager')
+    parser.add_argument('--drop-caches', action='store_true', help='kosongkan page cache sebelum setiap percobaan')
+    parser.add_argument('--cold-keras-cache', action='store_true', help='KERAS_HOME kosong di setiap percobaan')
+    parser.add_argument('--child', choices=SOURCES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    columns = ('import', 'load', 'first_inference', 'total')
+    print(f"{'sumber':<10} " + ' '.join(f'{column + " (s)":>22}' for column in columns) + f" {'RSS (MB)':>10}")
+    for source in [source for source in args.sources.split(',') if source]:
+        results = []
+        try:
+            for _ in range(args.runs):
+                if args.drop_caches:
+                    drop_caches()
+                results.append(run_child(source, args))
+        except (RuntimeError, OSError) as e:
+            print(f"{source:<10} gagal: {e}")
+            continue
+        # Median per kolom; RSS puncak diambil yang terbesar
+        row = ' '.join(f"{statistics.median(result[column] for result in results):>22.2f}" for column in columns)
+        print(f"{source:<10} {row} {max(result['max_rss_mb'] for result in results):>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark decode + resize gambar ke tensor model: jalur lama vs jalur downscale-first.
+
+Jalur lama: tf.io.decode_jpeg resolusi penuh lalu tf.image.resize GAUSSIAN.
+Jalur baru: IngestedImage (decoder sesuai format, draft DCT untuk JPEG) dengan
+max_side CAPTION_DECODE_SIDE lalu resize yang sama. Setiap pengukuran berjalan di
+proses terpisah agar peak RSS tidak saling memengaruhi. Jalankan dari root repo:
+
+    python benchmarks/decode_benchmark.py --megapixels 1 12 24 48 --repeat 5
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image as PILImage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_image(megapixels, fmt):
+    # Gradien + noise ringan: ukuran file dan biaya decode mirip foto sungguhan
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    noise = np.random.default_rng(0).normal(0, 12, (height, width, 3)).astype(np.float32)
+    pixels = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    PILImage.fromarray(pixels).save(buffer, format=fmt, quality=90)
+    return buffer.getvalue()
+
+
+def legacy_path(data):
+    import tensorflow as tf
+
+    img = tf.io.decode_jpeg(data, channels=3)
+    img = tf.image.resize(img, (224, 224), method=tf.image.ResizeMethod.GAUSSIAN)
+    img = np.array(img)
+    img = tf.keras.applications.resnet_v2.preprocess_input(img)
+    return np.expand_dims(img, axis=0)
+
+
+def ingest_path(data, max_side):
+    from ingest import IngestedImage
+
+    return IngestedImage(data, max_side=max_side).model_tensor()
+
+
+def measure(path, data, repeat, max_side, queue):
+    import tensorflow  # noqa: F401  impor di luar pengukuran
+
+    run = (lambda: legacy_path(data)) if path == 'legacy' else (lambda: ingest_path(data, max_side))
+    run()
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((statistics.median(timings) * 1000, peak_rss / 1024, baseline_rss / 1024))
+
+
+def run_isolated(path, data, repeat, max_side):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(path, data, repeat, max_side, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--megapixels', type=float, nargs='+', default=[1, 12, 24, 48])
+    parser.add_argument('--formats', nargs='+', default=['JPEG', 'PNG'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-side', type=int, default=448)
+    args = parser.parse_args()
+
+    print(f"{'format':<6} {'MP':>5} {'path':<7} {'median ms':>10} {'peak RSS MB':>12}")
+    for fmt in args.formats:
+        for megapixels in args.megapixels:
+            data = make_image(megapixels, fmt)
+            # Jalur lama hanya memakai decode_jpeg; untuk PNG hasilnya error, jadi dilewati
+            paths = ['legacy', 'ingest'] if fmt == 'JPEG' else ['ingest']
+            for path in paths:
+                latency, peak_rss, _ = run_isolated(path, data, args.repeat, args.max_side)
+                print(f"{fmt:<6} {megapixels:>5g} {path:<7} {latency:>10.1f} {peak_rss:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
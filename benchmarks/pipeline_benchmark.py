@@ -0,0 +1,233 @@
+"""Benchmark end-to-end pipeline captioning, diukur per tahap dan disimpan sebagai JSON.
+
+Tahap yang diukur: decode/resize gambar, preprocess, fitur ResNet50V2, satu langkah
+decoding, caption total, encode WebP dan thumbnail unggahan, pengayaan (terhadap server tiruan lokal, bukan
+layanan eksternal) dan insert ke database (SQLite sementara kecuali
+BENCHMARK_DATABASE_URL diisi). Bandingkan dengan hasil sebelumnya untuk menandai
+regresi. Jalankan dari root repo:
+
+    python benchmarks/pipeline_benchmark.py --output bench.json
+    python benchmarks/pipeline_benchmark.py --baseline bench.json --threshold 0.15 --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.decode_benchmark import make_image  # noqa: E402
+from config import Config  # noqa: E402
+from enrichment import Enricher  # noqa: E402
+from ingest import IngestedImage  # noqa: E402
+from storage import UploadStore  # noqa: E402
+from tools.stub_upstream import StubHandler  # noqa: E402
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': statistics.median(timings),
+        'p90_ms': float(np.percentile(timings, 90)),
+        'min_ms': min(timings),
+        'runs': repeat,
+    }
+
+
+def bench_images(results, args):
+    from inference import preprocess_pixels
+
+    for megapixels in args.resolutions:
+        for fmt in args.formats:
+            data = make_image(megapixels, fmt)
+            results[f'decode/{fmt.lower()}/{megapixels:g}MP'] = measure(
+                lambda: IngestedImage(data, max_side=Config.CAPTION_DECODE_SIDE,
+                                      max_pixels=Config.IMAGE_MAX_PIXELS).pixels, args.repeat)
+
+        data = make_image(megapixels, 'JPEG')
+        pixels = IngestedImage(data, max_side=Config.CAPTION_DECODE_SIDE).pixels
+        results[f'preprocess/{megapixels:g}MP'] = measure(lambda: preprocess_pixels(pixels), args.repeat)
+
+        # Jalur encode yang dijalankan worker latar belakang UploadStore: WebP dan thumbnail
+        # dengan kualitas dan method dari konfigurasi, ditulis ke direktori sementara
+        stored = IngestedImage(data, max_side=Config.UPLOAD_MAX_SIDE)
+        with tempfile.TemporaryDirectory() as root:
+            store = UploadStore(root=root, webp_quality=Config.UPLOAD_WEBP_QUALITY,
+                                webp_method=Config.UPLOAD_WEBP_METHOD, thumbnail_sizes=Config.UPLOAD_THUMBNAIL_SIZES)
+            os.makedirs(os.path.dirname(store.path_for(stored.hash)))
+            results[f'upload_encode/{megapixels:g}MP'] = measure(
+                lambda: store._encode(stored.hash, stored.image), args.repeat)
+
+
+def bench_model(results, args):
+    import tensorflow as tf
+    from inference import caption_features, extract_features, preprocess_pixels
+    from model_registry import registry
+
+    registry.warm_up()
+    backend = registry.backend
+    tensor = preprocess_pixels(IngestedImage(make_image(1, 'JPEG'), max_side=Config.CAPTION_DECODE_SIDE).pixels)
+    start_token = registry.tokenizer.word_index['<start>']
+
+    for batch_size in args.batch_sizes:
+        tensors = np.repeat(tensor, batch_size, axis=0)
+        features = extract_features(tensors).numpy()
+        results[f'features/batch{batch_size}'] = measure(lambda: extract_features(tensors), args.repeat)
+
+        def decode_steps():
+            enc_output = tf.repeat(backend.encode(features), args.beam_width, axis=0)
+            cache = backend.init_cache(enc_output)
+            tokens = tf.fill([batch_size * args.beam_width, 1], start_token)
+            for position in range(args.steps):
+                _, _, cache = backend.decode_step(tokens, position, cache)
+        stats = measure(decode_steps, args.repeat)
+        results[f'decode_step/batch{batch_size}'] = {
+            key: value / args.steps if key.endswith('_ms') else value for key, value in stats.items()}
+
+        results[f'caption/batch{batch_size}'] = measure(
+            lambda: caption_features(features, args.beam_width), args.repeat)
+
+
+def bench_enrichment(results, args):
+    StubHandler.latency = StubHandler.upload_latency = args.upstream_latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    enricher = Enricher(url, f'{url}/upload')
+    data = make_image(1, 'JPEG')
+    try:
+        results['enrichment'] = measure(
+            lambda: enricher.run(lambda start_upload: 'seekor kucing di atas meja', data, 'image.jpg', 'image/jpeg'), args.repeat)
+    finally:
+        server.shutdown()
+
+
+def bench_database(results, args):
+    # URI diganti sebelum app diimpor agar benchmark tidak pernah menulis ke database produksi
+    Config.SQLALCHEMY_DATABASE_URI = os.getenv(
+        'BENCHMARK_DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')}")
+    from app import app
+    from extensions import db
+    from models import Images, Users
+
+    with app.app_context():
+        db.create_all()
+        user = Users.query.filter_by(username='benchmark').first()
+        if user is None:
+            user = Users(username='benchmark', password='-')
+            db.session.add(user)
+            db.session.commit()
+        user_id = user.id
+
+        def insert():
+            db.session.add(Images(user_id=user_id, image_path='static/uploads/benchmark.webp',
+                                  predicted_caption='seekor kucing di atas meja'))
+            db.session.commit()
+        results['db_insert'] = measure(insert, args.repeat)
+        Images.query.filter_by(user_id=user_id).delete()
+        db.session.commit()
+
+
+STAGES = {
+    'images': bench_images,
+    'model': bench_model,
+    'enrichment': bench_enrichment,
+    'database': bench_database,
+}
+
+
+def metadata():
+    meta = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'inference_backend': Config.INFERENCE_BACKEND,
+    }
+    try:
+        import tensorflow as tf
+        meta['tensorflow'] = tf.__version__
+    except ImportError:
+        pass
+    try:
+        meta['commit'] = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                                 stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return meta
+
+
+def compare(results, baseline, threshold):
+    """Mengembalikan daftar (tahap, median baseline, median sekarang, rasio) yang melambat melebihi threshold."""
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous['median_ms']:
+            continue
+        ratio = stats['median_ms'] / previous['median_ms']
+        if ratio > 1 + threshold:
+            regressions.append((name, previous['median_ms'], stats['median_ms'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=list(STAGES))
+    parser.add_argument('--resolutions', type=float, nargs='+', default=[1, 12], help='megapiksel')
+    parser.add_argument('--formats', nargs='+', default=['JPEG', 'PNG', 'WEBP'])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--beam-width', type=int, default=3)
+    parser.add_argument('--steps', type=int, default=20, help='jumlah langkah decoding yang diukur')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--upstream-latency-ms', type=float, default=0)
+    parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    parser.add_argument('--baseline', help='file JSON hasil run sebelumnya')
+    parser.add_argument('--threshold', type=float, default=0.2, help='perlambatan median yang dianggap regresi')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    results = {}
+    for stage in args.stages:
+        STAGES[stage](results, args)
+
+    print(f"{'tahap':<28} {'median ms':>10} {'p90 ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<28} {stats['median_ms']:>10.2f} {stats['p90_ms']:>10.2f}")
+
+    report = {'meta': metadata(), 'config': {key: value for key, value in vars(args).items()
+                                             if key not in ('output', 'baseline')}, 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan ke {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESI {name}: {before:.2f} ms -> {after:.2f} ms ({ratio:.2f}x)")
+        if not regressions:
+            print(f"Tidak ada regresi di atas {args.threshold:.0%} dibanding {args.baseline}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
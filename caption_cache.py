@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image as PILImage, UnidentifiedImageError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Backend LRU di memori proses."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Backend LRU di disk (SQLite), dapat dipakai bersama oleh beberapa worker."""
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS caption_cache ('
+            ' key TEXT PRIMARY KEY, caption TEXT, corrected_caption TEXT,'
+            ' final_caption TEXT, last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_caption_cache_last_used ON caption_cache (last_used)')
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT caption, corrected_caption, final_caption FROM caption_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE caption_cache SET last_used = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+        return {'caption': row[0], 'corrected_caption': row[1], 'final_caption': row[2]}
+
+    def put(self, key, entry):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO caption_cache (key, caption, corrected_caption, final_caption, last_used)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (key, entry['caption'], entry['corrected_caption'], entry['final_caption'], time.time())
+            )
+            self._conn.execute(
+                'DELETE FROM caption_cache WHERE key IN ('
+                ' SELECT key FROM caption_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM caption_cache').fetchone()[0]
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(data):
+    # dHash 64-bit: tahan terhadap re-encode/kompresi ulang dari foto yang sama
+    try:
+        with PILImage.open(BytesIO(data)) as img:
+            img = img.convert('L').resize((9, 8), PILImage.LANCZOS)
+            pixels = list(img.getdata())
+    except (UnidentifiedImageError, OSError):
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f'{bits:016x}'
+
+
+class CaptionCache:
+    """Cache caption (mentah, terkoreksi, final) berdasarkan hash isi file gambar."""
+
+    def __init__(self, backend, use_perceptual_hash=False):
+        self.backend = backend
+        self.use_perceptual_hash = use_perceptual_hash
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _keys(self, data):
+        keys = [f'sha256:{content_hash(data)}']
+        if self.use_perceptual_hash:
+            phash = perceptual_hash(data)
+            if phash:
+                keys.append(f'dhash:{phash}')
+        return keys
+
+    def get(self, data):
+        entry = None
+        for key in self._keys(data):
+            entry = self.backend.get(key)
+            if entry is not None:
+                break
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, data, caption, corrected_caption, final_caption):
+        entry = {'caption': caption, 'corrected_caption': corrected_caption, 'final_caption': final_caption}
+        for key in self._keys(data):
+            self.backend.put(key, entry)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_caption_cache(config):
+    """Mengembalikan cache caption sesuai konfigurasi, atau None bila dinonaktifkan."""
+    global _cache
+    backend_name = config['CAPTION_CACHE_BACKEND']
+    if backend_name == 'none':
+        return None
+    with _cache_lock:
+        if _cache is None:
+            if backend_name == 'sqlite':
+                backend = SQLiteBackend(config['CAPTION_CACHE_PATH'], config['CAPTION_CACHE_SIZE'])
+            elif backend_name == 'memory':
+                backend = MemoryBackend(config['CAPTION_CACHE_SIZE'])
+            else:
+                raise ValueError(f"Backend cache caption tidak dikenal: {backend_name}")
+            _cache = CaptionCache(backend, use_perceptual_hash=config['CAPTION_CACHE_PERCEPTUAL_HASH'])
+        return _cache
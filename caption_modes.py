@@ -0,0 +1,99 @@
+import logging
+import math
+import threading
+
+import numpy as np
+from flask import current_app
+
+from admission import get_admission_controller
+from batcher import decode_options
+from feature_cache import feature_key, get_feature_cache
+from metrics import timed
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CAPTION_MODES = ('full', 'fast', 'auto')
+
+# Sisi grid fitur ResNet50V2 untuk input 224x224, yaitu grid yang dilihat decoder saat training
+FULL_GRID_SIDE = 224 // 32
+
+
+class LatencyTracker:
+    """Rata-rata bergerak eksponensial durasi caption per mode, dalam detik.
+
+    Dipakai mode 'auto' untuk memperkirakan apakah pipeline lengkap masih muat
+    dalam anggaran latensi request.
+    """
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, mode, seconds):
+        with self._lock:
+            previous = self._values.get(mode)
+            self._values[mode] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def estimate(self, mode):
+        with self._lock:
+            return self._values.get(mode)
+
+
+latency_tracker = LatencyTracker()
+
+
+def choose_mode(mode, budget_ms, admission):
+    """Menentukan mode yang dijalankan: 'full' atau 'fast'.
+
+    Mode 'auto' memilih 'full' selama perkiraan durasinya (ditambah giliran antrian
+    inferensi yang sedang menunggu) tidak melebihi budget_ms. Tanpa anggaran atau
+    tanpa data latensi, pipeline lengkap yang dipakai.
+    """
+    if mode != 'auto':
+        return mode
+    estimate = latency_tracker.estimate('full')
+    if not budget_ms or estimate is None:
+        return 'full'
+    estimate *= 1 + admission.waiting / admission.max_concurrent
+    return 'full' if estimate * 1000 <= budget_ms else 'fast'
+
+
+def _resize_grid(features):
+    # Grid dari input yang lebih kecil (mis. 5x5) dikembalikan ke 7x7 agar posisi
+    # encoder sama dengan saat training
+    side = int(math.isqrt(features.shape[0]))
+    if side == FULL_GRID_SIDE:
+        return features
+    import tensorflow as tf
+
+    grid = tf.reshape(features, (1, side, side, features.shape[-1]))
+    grid = tf.image.resize(grid, (FULL_GRID_SIDE, FULL_GRID_SIDE), method='bilinear')
+    return tf.reshape(grid, (-1, features.shape[-1])).numpy()
+
+
+def run_fast_caption(image, background=False, options=None):
+    """Caption cepat untuk operasi terdegradasi: greedy decoding, panjang maksimum kecil, tanpa pengayaan.
+
+    Cache caption diperiksa oleh pemanggil (run_caption_with_mode). Grid fitur diambil
+    dari cache fitur bila ada, selain itu ResNet50V2 dijalankan pada resolusi
+    FAST_CAPTION_IMAGE_SIZE. Decoder dilatih pada fitur ResNet50V2, jadi backbone lain
+    tidak dapat dipakai di sini.
+    """
+    from inference import caption_features, extract_features, preprocess_pixels
+
+    config = current_app.config
+    options = decode_options(config, options)
+    options['max_length'] = min(options['max_length'], config['FAST_CAPTION_MAX_LENGTH'])
+
+    feature_cache = get_feature_cache(config)
+    features = feature_cache.get(feature_key(image)) if feature_cache else None
+
+    with get_admission_controller(config).slot(background), timed('model_fast'):
+        if features is None:
+            # Grid resolusi rendah tidak disimpan: cache fitur hanya berisi grid 224x224
+            tensor = preprocess_pixels(image.pixels, config['FAST_CAPTION_IMAGE_SIZE'])
+            features = _resize_grid(extract_features(tensor).numpy()[0])
+        caption = caption_features(features[np.newaxis, ...], beam_width=1, **options)[0]
+    return ' '.join([word for word in caption if word != "<unk>"])
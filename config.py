@@ -8,4 +8,121 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY') or 'rahasia'
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL') or 'mysql+pymysql://root:@localhost/seeimg'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    TEMPLATES_AUTO_RELOAD = True
\ No newline at end of file
+    TEMPLATES_AUTO_RELOAD = True
+
+    # Pool koneksi database (lihat database.engine_options); recycle di bawah
+    # wait_timeout MySQL, dan cache pengguna untuk user_loader (0 = nonaktif)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 280))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 30))
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+
+    # Pencarian caption: 'auto' (FULLTEXT di MySQL, FTS5 di SQLite), 'mysql',
+    # 'sqlite_fts' atau 'memory' (indeks di memori per proses)
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+    SEARCH_MAX_TERMS = int(os.getenv('SEARCH_MAX_TERMS', 8))
+
+    # Indeks kemiripan visual per pengguna (kosong = nonaktif): ambang cosine unggahan
+    # hampir identik, lalu partisi IVF setelah indeks pengguna mencapai ukuran tertentu
+    SIMILARITY_INDEX_DIR = os.getenv('SIMILARITY_INDEX_DIR', '')
+    SIMILARITY_DUPLICATE_THRESHOLD = float(os.getenv('SIMILARITY_DUPLICATE_THRESHOLD', 0.97))
+    SIMILARITY_IVF_MIN_SIZE = int(os.getenv('SIMILARITY_IVF_MIN_SIZE', 2000))
+    SIMILARITY_IVF_PROBES = int(os.getenv('SIMILARITY_IVF_PROBES', 8))
+
+    # Micro-batching lintas request untuk inferensi caption
+    CAPTION_BATCHING = os.getenv('CAPTION_BATCHING', 'false').lower() == 'true'
+    CAPTION_MAX_BATCH_SIZE = int(os.getenv('CAPTION_MAX_BATCH_SIZE', 8))
+    CAPTION_MAX_WAIT_MS = float(os.getenv('CAPTION_MAX_WAIT_MS', 10))
+
+    # Cache caption berdasarkan hash isi gambar: 'memory', 'sqlite' atau 'none'
+    CAPTION_CACHE_BACKEND = os.getenv('CAPTION_CACHE_BACKEND', 'memory')
+    CAPTION_CACHE_SIZE = int(os.getenv('CAPTION_CACHE_SIZE', 1024))
+    CAPTION_CACHE_PATH = os.getenv('CAPTION_CACHE_PATH', 'instance/caption_cache.sqlite3')
+    CAPTION_CACHE_PERCEPTUAL_HASH = os.getenv('CAPTION_CACHE_PERCEPTUAL_HASH', 'false').lower() == 'true'
+
+    # Cache grid fitur ResNet50V2 per hash gambar (kosongkan untuk menonaktifkan)
+    FEATURE_CACHE_DIR = os.getenv('FEATURE_CACHE_DIR', '')
+    FEATURE_CACHE_DTYPE = os.getenv('FEATURE_CACHE_DTYPE', 'float16')
+
+    # Layanan eksternal untuk pengayaan caption
+    NYXS_API_URL = os.getenv('NYXS_API_URL', 'https://api.nyxs.pw')
+    UPLOADER_URL = os.getenv('UPLOADER_URL', 'https://uploader.nyxs.pw/upload')
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 15))
+    ENRICHMENT_DEADLINE = float(os.getenv('ENRICHMENT_DEADLINE', 20))
+    ENRICHMENT_WORKERS = int(os.getenv('ENRICHMENT_WORKERS', 8))
+
+    # Job captioning asinkron untuk POST /images (?async=true per request)
+    CAPTION_ASYNC_JOBS = os.getenv('CAPTION_ASYNC_JOBS', 'false').lower() == 'true'
+    CAPTION_JOB_WORKERS = int(os.getenv('CAPTION_JOB_WORKERS', 2))
+    CAPTION_JOB_POLL_INTERVAL = float(os.getenv('CAPTION_JOB_POLL_INTERVAL', 0.5))
+    CAPTION_JOB_EVENTS_TIMEOUT = float(os.getenv('CAPTION_JOB_EVENTS_TIMEOUT', 120))
+
+    # Pagination riwayat GET /images
+    HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 20))
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', 100))
+
+    # Decode gambar: batas piksel (decompression bomb) dan sisi terpanjang setelah
+    # decode; JPEG besar di-decode langsung pada skala DCT tereduksi
+    IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 64_000_000))
+    UPLOAD_MAX_SIDE = int(os.getenv('UPLOAD_MAX_SIDE', 2048))
+    CAPTION_DECODE_SIDE = int(os.getenv('CAPTION_DECODE_SIDE', 448))
+
+    # Penyimpanan unggahan berdasarkan hash isi: WebP dan thumbnail di-encode di latar
+    # belakang (method 0-6, makin tinggi makin lambat) dan disajikan dengan cache panjang
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'static/uploads')
+    UPLOAD_WEBP_QUALITY = int(os.getenv('UPLOAD_WEBP_QUALITY', 65))
+    UPLOAD_WEBP_METHOD = int(os.getenv('UPLOAD_WEBP_METHOD', 4))
+    UPLOAD_THUMBNAIL_SIZES = [int(size) for size in os.getenv('UPLOAD_THUMBNAIL_SIZES', '128').split(',') if size]
+    UPLOAD_ENCODE_WORKERS = int(os.getenv('UPLOAD_ENCODE_WORKERS', 2))
+    UPLOAD_CACHE_MAX_AGE = int(os.getenv('UPLOAD_CACHE_MAX_AGE', 365 * 24 * 3600))
+
+    # Artifact model (manifest.json + weights.bin + vocab.npy) dari
+    # tools/build_model_artifact.py; bila tidak ada, dipakai pickle tokenizer dan .h5
+    MODEL_ARTIFACT_DIR = os.getenv('MODEL_ARTIFACT_DIR', 'assets/model_artifact')
+
+    # Backend inferensi: 'eager', 'graph' (tf.function) atau 'tflite' (feature
+    # extractor terkuantisasi: 'float16', 'dynamic' atau 'none')
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'eager')
+    TFLITE_MODEL_DIR = os.getenv('TFLITE_MODEL_DIR', 'instance')
+    TFLITE_QUANTIZATION = os.getenv('TFLITE_QUANTIZATION', 'float16')
+    TFLITE_NUM_THREADS = int(os.getenv('TFLITE_NUM_THREADS', 0)) or None
+
+    # Panjang caption maksimum (token); juga ukuran tabel posisi decoder
+    MAX_CAPTION_LENGTH = int(os.getenv('MAX_CAPTION_LENGTH', 100))
+
+    # Berhenti lebih awal saat decoding: hentikan hipotesis yang mengulang n-gram
+    # sepanjang ini, dan akhiri bila probabilitas <end> mencapai ambang (0 = nonaktif)
+    CAPTION_REPETITION_NGRAM = int(os.getenv('CAPTION_REPETITION_NGRAM', 0))
+    CAPTION_END_THRESHOLD = float(os.getenv('CAPTION_END_THRESHOLD', 0))
+
+    # POST /captioning/batch: ukuran batch model, pool decode dan batas per request
+    BATCH_CAPTION_SIZE = int(os.getenv('BATCH_CAPTION_SIZE', 16))
+    BATCH_DECODE_WORKERS = int(os.getenv('BATCH_DECODE_WORKERS', 4))
+    BATCH_MAX_CONCURRENT = int(os.getenv('BATCH_MAX_CONCURRENT', 2))
+    BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 1000))
+    BATCH_MAX_BYTES = int(os.getenv('BATCH_MAX_BYTES', 512 * 1024 * 1024))
+    BATCH_MAX_IMAGE_BYTES = int(os.getenv('BATCH_MAX_IMAGE_BYTES', 25 * 1024 * 1024))
+
+    # Header Server-Timing per request berisi durasi tiap tahap pipeline
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() == 'true'
+
+    # Admission control inferensi per worker: slot bersamaan, antrian tunggu terbatas,
+    # lalu 503 + Retry-After; thread TensorFlow (0 = dibagi rata per slot inferensi)
+    INFERENCE_MAX_CONCURRENT = int(os.getenv('INFERENCE_MAX_CONCURRENT', 2))
+    INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', 16))
+    INFERENCE_QUEUE_TIMEOUT = float(os.getenv('INFERENCE_QUEUE_TIMEOUT', 10))
+    INFERENCE_RETRY_AFTER = int(os.getenv('INFERENCE_RETRY_AFTER', 2))
+    TF_INTRA_OP_THREADS = int(os.getenv('TF_INTRA_OP_THREADS', 0))
+    TF_INTER_OP_THREADS = int(os.getenv('TF_INTER_OP_THREADS', 0))
+
+    # Mode caption default: 'full' (beam search + pengayaan), 'fast' (greedy, pendek,
+    # tanpa pengayaan) atau 'auto' (dipilih dari anggaran latensi, 0 = tanpa anggaran)
+    CAPTION_MODE = os.getenv('CAPTION_MODE', 'full')
+    CAPTION_LATENCY_BUDGET_MS = float(os.getenv('CAPTION_LATENCY_BUDGET_MS', 0))
+    FAST_CAPTION_MAX_LENGTH = int(os.getenv('FAST_CAPTION_MAX_LENGTH', 20))
+    FAST_CAPTION_IMAGE_SIZE = int(os.getenv('FAST_CAPTION_IMAGE_SIZE', 160))
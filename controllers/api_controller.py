@@ -1,16 +1,43 @@
 import os
+import json
 import logging
-import requests
 from PIL import UnidentifiedImageError
-from flask import Blueprint, request, jsonify, current_app
-from utils import load_image_from_file, evaluate_beam_search, correct_caption, get_gemini_caption, VALID_IMAGE_FORMATS
-from bs4 import BeautifulSoup
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from utils import VALID_IMAGE_FORMATS
+from caption_cache import get_caption_cache
+from ingest import IngestedImage
+from pipeline import run_caption_with_mode
+from caption_modes import CAPTION_MODES
+from batch_captioning import BatchCaptioner, BatchLimitError, get_batch_slots, iter_uploads
+from admission import Overloaded, get_admission_controller
+from metrics import length_distribution
 
 captioning = Blueprint('captioning', __name__)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _request_number(name, cast, minimum, maximum=None):
+    value = request.values.get(name)
+    if value is None:
+        return None
+    try:
+        value = cast(value)
+    except ValueError:
+        raise ValueError(f"{name} harus berupa angka")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValueError(f"{name} di luar rentang yang diizinkan")
+    return value
+
+def _decode_overrides():
+    # Kontrol decoding per request; yang tidak dikirim memakai default config
+    overrides = {
+        'max_length': _request_number('max_tokens', int, 1, current_app.config['MAX_CAPTION_LENGTH']),
+        'repetition_ngram': _request_number('repetition_ngram', int, 0, 10),
+        'end_threshold': _request_number('end_threshold', float, 0, 1),
+    }
+    return {key: value for key, value in overrides.items() if value is not None}
+
 @captioning.route('/captioning', methods=['POST'])
 def caption_image():
     if 'file' not in request.files:
@@ -20,47 +47,83 @@ def caption_image():
         return jsonify({"error": "Tidak ada file yang dipilih"}), 400
     if file.content_type.split("/")[-1] not in VALID_IMAGE_FORMATS:
         return jsonify({"error": "Format gambar tidak valid"}), 400
+    mode = request.values.get('mode')
+    if mode is not None and mode not in CAPTION_MODES:
+        return jsonify({"error": f"Mode tidak valid, pilih salah satu dari {', '.join(CAPTION_MODES)}"}), 400
+    try:
+        budget_ms = _request_number('latency_budget_ms', float, 0)
+        options = _decode_overrides()
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    admission = get_admission_controller(current_app.config)
+    if admission.is_saturated():
+        return jsonify({"error": "Server sedang sibuk, coba lagi sebentar lagi"}), 503, {'Retry-After': str(admission.retry_after)}
     
     try:
-        image_tensor = load_image_from_file(file)
-        caption, _, _ = evaluate_beam_search(image_tensor)
-        caption = ' '.join([word for word in caption if word != "<unk>"])
-        
-        try:
-            corrected_caption = correct_caption(caption)
-        except Exception as e:
-            logger.error(f"Kesalahan saat mengoreksi caption: {str(e)}")
-            corrected_caption = caption
-        
-        # Rewind the file pointer to the beginning of the file
-        file.seek(0)
-        files = {'file': (file.filename, file.stream, file.content_type)}
-        response = requests.post('https://uploader.nyxs.pw/upload', files=files)
-
-        img_url = None
-
-        if response.status_code == 200:
-            # Parsing HTML response to extract the URL
-            soup = BeautifulSoup(response.content, 'html.parser')
-            url_tag = soup.find('a')
-            
-            if url_tag and url_tag.get('href'):
-                img_url = url_tag.get('href')
-            else:
-                logger.error("URL tidak ditemukan dalam respons")
-        else:
-            logger.error("Gagal mengunggah gambar ke uploader.nyxs.pw")
-        
-        # If upload is successful and img_url is not None, get the Gemini caption
-        if img_url:
-            gemini_caption = get_gemini_caption(img_url, corrected_caption)
-            final_caption = gemini_caption if gemini_caption else corrected_caption
-        else:
-            final_caption = corrected_caption
+        # Tanpa WebP yang disimpan, gambar cukup di-decode pada resolusi dekat input model
+        image = IngestedImage.from_upload(file, max_side=current_app.config['CAPTION_DECODE_SIDE'],
+                                          max_pixels=current_app.config['IMAGE_MAX_PIXELS'])
+        final_caption, used_mode = run_caption_with_mode(image, mode, budget_ms, options)
 
-        return jsonify({"caption": final_caption})
+        return jsonify({"caption": final_caption, "mode": used_mode})
+    except Overloaded as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except UnidentifiedImageError:
         return jsonify({"error": "File gambar tidak valid"}), 400
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.error(f"Kesalahan: {str(e)}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@captioning.route('/captioning/cache', methods=['GET'])
+def caption_cache_stats():
+    cache = get_caption_cache(current_app.config)
+    if cache is None:
+        return jsonify({"backend": None})
+    return jsonify(cache.stats())
+
+@captioning.route('/captioning/lengths', methods=['GET'])
+def caption_length_stats():
+    # Distribusi panjang caption di worker ini, untuk menentukan MAX_CAPTION_LENGTH dari data
+    return jsonify(length_distribution())
+
+@captioning.route('/captioning/batch', methods=['POST'])
+def caption_batch():
+    # Banyak file di field "files" dan/atau arsip zip/tar; hasil dialirkan sebagai NDJSON
+    files = [file for file in request.files.getlist('files') + request.files.getlist('file') if file.filename]
+    if not files:
+        return jsonify({"error": "Bagian file tidak ada"}), 400
+
+    config = current_app.config
+    slots = get_batch_slots(config)
+    if not slots.acquire(blocking=False):
+        return jsonify({"error": "Terlalu banyak batch yang sedang berjalan"}), 429, {'Retry-After': '5'}
+
+    def generate(items, captioner):
+        processed = failed = 0
+        try:
+            for result in captioner.run(items):
+                processed += 1
+                failed += 'error' in result
+                yield json.dumps(result) + '\n'
+        except BatchLimitError as e:
+            yield json.dumps({"error": str(e)}) + '\n'
+        except Exception as e:
+            logger.error(f"Kesalahan batch: {str(e)}")
+            yield json.dumps({"error": str(e)}) + '\n'
+        yield json.dumps({"done": True, "processed": processed, "failed": failed}) + '\n'
+
+    try:
+        items = iter_uploads(files, config['BATCH_MAX_FILES'], config['BATCH_MAX_BYTES'],
+                             config['BATCH_MAX_IMAGE_BYTES'])
+        response = Response(stream_with_context(generate(items, BatchCaptioner(config))),
+                            mimetype='application/x-ndjson')
+    except Exception as e:
+        # Sebelum respons terbentuk call_on_close belum terpasang, jadi slot dilepas di sini
+        slots.release()
+        logger.error(f"Kesalahan batch: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    # Slot dilepas saat respons ditutup, termasuk bila klien memutus koneksi
+    response.call_on_close(slots.release)
+    return response
@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from extensions import db
+from database import get_user_cache
 from models import *
 
 auth = Blueprint('auth', __name__)
@@ -40,6 +41,9 @@ def register():
             new_user = Users(username=username, password=hashed_password)
             db.session.add(new_user)
             db.session.commit()
+            cache = get_user_cache(current_app.config)
+            if cache:
+                cache.invalidate(new_user.id)
             login_user(new_user)
             return redirect(url_for('main'))
     
@@ -48,5 +52,8 @@ def register():
 @auth.route('/logout')
 @login_required
 def logout():
+    cache = get_user_cache(current_app.config)
+    if cache:
+        cache.invalidate(current_user.id)
     logout_user()
     return redirect(url_for('auth.login'))
@@ -1,23 +1,34 @@
-import os
+import base64
 import datetime
+import json
 import logging
-import uuid
+import time
 import pytz
-import requests
-from PIL import Image, UnidentifiedImageError
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
+from PIL import UnidentifiedImageError
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
-from utils import load_image_from_file, evaluate_beam_search, correct_caption, get_gemini_caption, VALID_IMAGE_FORMATS
+from utils import VALID_IMAGE_FORMATS
 from extensions import db
 from models import Images
-from bs4 import BeautifulSoup
+from ingest import IngestedImage
+from pipeline import run_upload_pipeline
+from jobs import get_job_queue, JOB_PENDING, JOB_DONE, JOB_FAILED
+from metrics import timed
+from admission import Overloaded, get_admission_controller
+from storage import get_upload_store, thumbnail_path
+from search import get_search_backend, tokenize
+from similarity import get_similarity_index
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 images = Blueprint('images', __name__)
 
+def release_upload(image_path):
+    # File bersama hanya dihapus bila tidak ada baris lain yang masih merujuknya
+    get_upload_store(current_app.config).delete(
+        image_path, lambda: db.session.query(Images.id).filter_by(image_path=image_path).first() is not None)
+
 @images.route('/images', methods=['POST'])
 @login_required
 def upload_image():
@@ -31,61 +42,32 @@ def upload_image():
     if file.content_type.split("/")[-1] not in VALID_IMAGE_FORMATS:
         logger.error("Format gambar tidak valid")
         return jsonify({"error": "Format gambar tidak valid"}), 400
+
+    # Mode job: simpan baris pending, caption diisi pekerja di latar belakang
+    async_mode = request.args.get('async', str(current_app.config['CAPTION_ASYNC_JOBS'])).lower() == 'true'
+    admission = get_admission_controller(current_app.config)
+    if not async_mode and admission.is_saturated():
+        return jsonify({"error": "Server sedang sibuk, coba lagi sebentar lagi"}), 503, {'Retry-After': str(admission.retry_after)}
     
+    store = get_upload_store(current_app.config)
+    webp_file_path = None
+    committed = False
     try:
-        # Simpan file asli untuk analisis model
-        file_ext = secure_filename(file.filename).split('.')[-1]
-        original_filename = f"{uuid.uuid4()}.{file_ext}"
-        upload_folder = 'static/uploads'
-        
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-        
-        original_file_path = os.path.join(upload_folder, original_filename)
-        file.save(original_file_path)
-        
-        # Load image for model analysis using the original file path
-        with open(original_file_path, 'rb') as f:
-            image_tensor = load_image_from_file(f)
-        
-        caption, _, _ = evaluate_beam_search(image_tensor)
-        caption = ' '.join([word for word in caption if word != "<unk>"])
-        
-        corrected_caption = correct_caption(caption)
-        
-        # Konversi gambar ke format WebP dengan kompresi dan simpan untuk penyimpanan yang efisien
-        webp_filename = f"{uuid.uuid4()}.webp"
-        webp_file_path = os.path.join(upload_folder, webp_filename)
-        
-        with Image.open(original_file_path) as img:
-            img = img.convert('RGB')
-            img.save(webp_file_path, format="webp", quality=65, method=6)
-        
-        # Upload the image to Nyxs Uploader
-        with open(original_file_path, 'rb') as f:
-            files = {'file': (file.filename, f, file.content_type)}
-            response = requests.post('https://uploader.nyxs.pw/upload', files=files)
-
-        img_url = None
-
-        if response.status_code == 200:
-            # Parsing HTML response to extract the URL
-            soup = BeautifulSoup(response.content, 'html.parser')
-            url_tag = soup.find('a')
-            
-            if url_tag and url_tag.get('href'):
-                img_url = url_tag.get('href')
-            else:
-                logger.error("URL tidak ditemukan dalam respons")
-        else:
-            logger.error("Gagal mengunggah gambar ke uploader.nyxs.pw")
-        
-        # If upload is successful and img_url is not None, get the Gemini caption
-        if img_url:
-            gemini_caption = get_gemini_caption(img_url, corrected_caption)
-            final_caption = gemini_caption if gemini_caption else corrected_caption
+        # Baca dan decode sekali; tensor model, WebP dan payload uploader diturunkan dari hasil yang sama
+        image = IngestedImage.from_upload(file, max_side=current_app.config['UPLOAD_MAX_SIDE'],
+                                          max_pixels=current_app.config['IMAGE_MAX_PIXELS'])
+
+        # Path WebP ditentukan oleh hash isi; encode WebP dan thumbnail berjalan di latar belakang
+        with timed('store'):
+            webp_file_path = store.save(image)
+
+        embedding = duplicate_of = None
+        if async_mode:
+            final_caption = ''
+            status = JOB_PENDING
         else:
-            final_caption = corrected_caption
+            final_caption, embedding, duplicate_of = run_upload_pipeline(image, current_user.id)
+            status = JOB_DONE
 
         wib = pytz.timezone('Asia/Jakarta')
         upload_date = datetime.datetime.now(wib)
@@ -94,12 +76,24 @@ def upload_image():
             user_id=current_user.id, 
             image_path=webp_file_path, 
             predicted_caption=final_caption, 
-            upload_date=upload_date
+            upload_date=upload_date,
+            status=status
         )
         db.session.add(new_image)
-        db.session.commit()
+        with timed('db_commit'):
+            db.session.commit()
+        committed = True
 
-        return jsonify({"caption": final_caption})
+        if async_mode:
+            get_job_queue(current_app.config).submit(
+                current_app._get_current_object(), new_image.id, image, current_user.id)
+            return jsonify({"job_id": new_image.id, "status": status}), 202
+
+        if embedding is not None:
+            get_similarity_index(current_app.config).add(current_user.id, new_image.id, embedding)
+        return jsonify({"caption": final_caption, "duplicate_of": duplicate_of})
+    except Overloaded as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except UnidentifiedImageError:
         logger.error("File gambar tidak valid")
         return jsonify({"error": "File gambar tidak valid"}), 400
@@ -109,26 +103,240 @@ def upload_image():
     except Exception as e:
         logger.error(f"Kesalahan: {str(e)}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        if webp_file_path:
+            store.finish(webp_file_path)
+            if not committed:
+                # Belum ada baris yang disimpan; file dihapus lagi bila tidak dipakai unggahan lain
+                db.session.rollback()
+                release_upload(webp_file_path)
+
+HISTORY_FIELDS = ("id", "image_path", "thumbnail_path", "upload_date", "predicted_caption", "status")
+
+def encode_cursor(upload_date, image_id):
+    payload = json.dumps([upload_date.isoformat(), image_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        upload_date, image_id = json.loads(payload)
+        return datetime.datetime.fromisoformat(upload_date), int(image_id)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor tidak valid")
+
+def serialize_image(row, fields, truncate=None):
+    data = {field: getattr(row, field) for field in fields if field != "thumbnail_path"}
+    if "thumbnail_path" in fields:
+        # Dihitung dari image_path; thumbnail terkecil cukup untuk tabel riwayat
+        sizes = current_app.config['UPLOAD_THUMBNAIL_SIZES']
+        data["thumbnail_path"] = thumbnail_path(row.image_path, min(sizes)) if sizes else row.image_path
+    if truncate is not None and data.get("predicted_caption") is not None:
+        caption = data["predicted_caption"]
+        data["caption_truncated"] = len(caption) > truncate
+        if data["caption_truncated"]:
+            data["predicted_caption"] = caption[:truncate].rstrip() + '...'
+    return data
+
+def parse_history_params():
+    """Parameter fields, truncate dan limit yang dipakai bersama route riwayat."""
+    fields = request.args.get('fields')
+    fields = [f for f in fields.split(',') if f] if fields else list(HISTORY_FIELDS)
+    unknown = set(fields) - set(HISTORY_FIELDS)
+    if unknown:
+        raise ValueError(f"Kolom tidak dikenal: {', '.join(sorted(unknown))}")
+    truncate = request.args.get('truncate', type=int)
+    if 'truncate' in request.args and (truncate is None or truncate <= 0):
+        raise ValueError("truncate harus bilangan bulat positif")
+    limit = min(max(request.args.get('limit', current_app.config['HISTORY_PAGE_SIZE'], type=int), 1),
+                current_app.config['HISTORY_MAX_PAGE_SIZE'])
+    return fields, truncate, limit
 
 @images.route('/images', methods=['GET'])
 @login_required
 def get_images():
+    """Riwayat gambar pengguna, terbaru lebih dulu.
+
+    Parameter opsional: limit dan cursor (pagination keyset pada upload_date dan id),
+    fields (daftar kolom dipisah koma) dan truncate (panjang maksimum caption).
+    Tanpa limit/cursor seluruh riwayat dikembalikan sebagai list seperti sebelumnya.
+    """
     try:
-        images = Images.query.filter_by(user_id=current_user.id).order_by(Images.upload_date.desc()).all()
-        images_data = [
-            {
-                "id": image.id,
-                "image_path": image.image_path,
-                "upload_date": image.upload_date,
-                "predicted_caption": image.predicted_caption
-            } 
-            for image in images
-        ]
-        return jsonify(images_data)
+        fields, truncate, limit = parse_history_params()
+        paginate = 'limit' in request.args or 'cursor' in request.args
+
+        # Hanya kolom yang diminta (plus kunci cursor) yang diambil dari database
+        columns = [Images.id, Images.upload_date]
+        # thumbnail_path dihitung dari image_path, bukan kolom tersendiri
+        selected = [field for field in fields if field != "thumbnail_path"]
+        if "thumbnail_path" in fields and "image_path" not in selected:
+            selected.append("image_path")
+        for field in selected:
+            if field == "predicted_caption" and truncate is not None:
+                # Potong di database; satu karakter lebih untuk mendeteksi caption yang terpotong
+                columns.append(db.func.substr(Images.predicted_caption, 1, truncate + 1).label("predicted_caption"))
+            elif field not in ("id", "upload_date"):
+                columns.append(getattr(Images, field))
+
+        query = db.session.query(*columns).filter(Images.user_id == current_user.id)
+        cursor = request.args.get('cursor')
+        if cursor:
+            upload_date, image_id = decode_cursor(cursor)
+            query = query.filter(db.or_(
+                Images.upload_date < upload_date,
+                db.and_(Images.upload_date == upload_date, Images.id < image_id)
+            ))
+        query = query.order_by(Images.upload_date.desc(), Images.id.desc())
+
+        if not paginate:
+            return jsonify([serialize_image(row, fields, truncate) for row in query.all()])
+
+        rows = query.limit(limit + 1).all()
+        next_cursor = encode_cursor(rows[limit - 1].upload_date, rows[limit - 1].id) if len(rows) > limit else None
+        return jsonify({
+            "items": [serialize_image(row, fields, truncate) for row in rows[:limit]],
+            "next_cursor": next_cursor
+        })
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.error(f"Kesalahan: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@images.route('/images/search', methods=['GET'])
+@login_required
+def search_images():
+    """Pencarian caption riwayat pengguna, diurutkan dari yang paling relevan.
+
+    Parameter: q (wajib; semua kata harus ada, kata terakhir boleh berupa awalan),
+    limit, cursor, fields dan truncate seperti GET /images. Setiap item membawa score.
+    """
+    try:
+        terms = tokenize(request.args.get('q', ''))[:current_app.config['SEARCH_MAX_TERMS']]
+        if not terms:
+            return jsonify({"error": "Kata kunci pencarian kosong"}), 400
+        fields, truncate, limit = parse_history_params()
+        # Hasil berperingkat tidak punya kunci urut yang stabil, jadi cursor berisi offset
+        cursor = request.args.get('cursor')
+        offset = decode_search_cursor(cursor) if cursor else 0
+
+        backend = get_search_backend(current_app.config, db.engine)
+        ranked = backend.search(db.session, current_user.id, terms, limit + 1, offset)
+        scores = dict(ranked[:limit])
+        rows = {row.id: row for row in Images.query.filter(Images.id.in_(scores), Images.user_id == current_user.id)}
+
+        items = []
+        for image_id in scores:
+            if image_id in rows:
+                item = serialize_image(rows[image_id], fields, truncate)
+                item["score"] = round(scores[image_id], 4)
+                items.append(item)
+        next_cursor = encode_search_cursor(offset + limit) if len(ranked) > limit else None
+        return jsonify({"items": items, "next_cursor": next_cursor, "backend": backend.name})
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.error(f"Kesalahan: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def encode_search_cursor(offset):
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode().rstrip('=')
+
+def decode_search_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return max(int(payload["offset"]), 0)
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Cursor tidak valid")
+
+@images.route('/images/<int:image_id>', methods=['GET'])
+@login_required
+def get_image(image_id):
+    image = Images.query.get(image_id)
+    if image is None or image.user_id != current_user.id:
+        return jsonify({"error": "Gambar tidak ditemukan atau pengguna tidak diizinkan"}), 404
+    return jsonify(serialize_image(image, HISTORY_FIELDS))
+
+@images.route('/images/<int:image_id>/similar', methods=['GET'])
+@login_required
+def similar_images(image_id):
+    """Gambar pengguna yang paling mirip secara visual, diurutkan dari skor cosine tertinggi.
+
+    Parameter opsional: limit, fields dan truncate seperti GET /images.
+    """
+    try:
+        image = Images.query.get(image_id)
+        if image is None or image.user_id != current_user.id:
+            return jsonify({"error": "Gambar tidak ditemukan atau pengguna tidak diizinkan"}), 404
+        index = get_similarity_index(current_app.config)
+        if index is None:
+            return jsonify({"error": "Indeks kemiripan tidak aktif"}), 404
+        fields, truncate, limit = parse_history_params()
+        ranked = index.similar(current_user.id, image_id, limit)
+        if ranked is None:
+            return jsonify({"error": "Gambar belum ada di indeks kemiripan"}), 404
+        scores = dict(ranked)
+        rows = {row.id: row for row in Images.query.filter(Images.id.in_(scores), Images.user_id == current_user.id)}
+
+        items = []
+        for similar_id in scores:
+            if similar_id in rows:
+                item = serialize_image(rows[similar_id], fields, truncate)
+                item["score"] = round(scores[similar_id], 4)
+                items.append(item)
+        return jsonify({"items": items})
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.error(f"Kesalahan: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def job_data(image):
+    return {
+        "job_id": image.id,
+        "status": image.status,
+        "caption": image.predicted_caption if image.status == JOB_DONE else None
+    }
+
+@images.route('/images/<int:image_id>/status', methods=['GET'])
+@login_required
+def get_image_status(image_id):
+    image = Images.query.get(image_id)
+    if image is None or image.user_id != current_user.id:
+        return jsonify({"error": "Gambar tidak ditemukan atau pengguna tidak diizinkan"}), 404
+    return jsonify(job_data(image))
+
+@images.route('/images/<int:image_id>/events', methods=['GET'])
+@login_required
+def image_status_events(image_id):
+    image = Images.query.get(image_id)
+    if image is None or image.user_id != current_user.id:
+        return jsonify({"error": "Gambar tidak ditemukan atau pengguna tidak diizinkan"}), 404
+
+    interval = current_app.config['CAPTION_JOB_POLL_INTERVAL']
+    timeout = current_app.config['CAPTION_JOB_EVENTS_TIMEOUT']
+
+    def stream():
+        # Server-sent events: kirim status setiap kali berubah sampai job selesai
+        last_status = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # Akhiri transaksi sebelumnya agar perubahan dari pekerja job terlihat
+            db.session.rollback()
+            image = Images.query.get(image_id)
+            if image is None:
+                yield f"event: deleted\ndata: {json.dumps({'job_id': image_id})}\n\n"
+                return
+            if image.status != last_status:
+                last_status = image.status
+                yield f"event: status\ndata: {json.dumps(job_data(image))}\n\n"
+            if image.status in (JOB_DONE, JOB_FAILED):
+                return
+            time.sleep(interval)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @images.route('/images/<int:image_id>', methods=['DELETE'])
 @login_required
 def delete_image(image_id):
@@ -138,11 +346,13 @@ def delete_image(image_id):
             logger.error("Gambar tidak ditemukan atau pengguna tidak diizinkan")
             return jsonify({"error": "Gambar tidak ditemukan atau pengguna tidak diizinkan"}), 404
         
-        if os.path.exists(image.image_path):
-            os.remove(image.image_path)
-        
+        image_path = image.image_path
         db.session.delete(image)
         db.session.commit()
+        release_upload(image_path)
+        index = get_similarity_index(current_app.config)
+        if index:
+            index.remove(current_user.id, image_id)
 
         return jsonify({"message": "Gambar berhasil dihapus"}), 200
     except Exception as e:
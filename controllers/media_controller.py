@@ -0,0 +1,35 @@
+import os
+import logging
+from flask import Blueprint, abort, current_app, send_file
+from werkzeug.security import safe_join
+from storage import CONTENT_NAME, LEGACY_NAME, get_upload_store
+
+media = Blueprint('media', __name__)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@media.route('/static/uploads/<path:filename>', methods=['GET'])
+def serve_upload(filename):
+    # Lebih spesifik dari route /static bawaan Flask, sehingga unggahan lewat sini
+    # Hanya WebP hasil encode dan thumbnail-nya; byte asli sementara (.src) dan file
+    # lain di bawah root penyimpanan tidak pernah dikirim
+    name = os.path.basename(filename)
+    match = CONTENT_NAME.match(name)
+    if not match and not LEGACY_NAME.match(name):
+        abort(404)
+    config = current_app.config
+    store = get_upload_store(config)
+    path = safe_join(store.root, filename)
+    if path is None or not store.ensure(path):
+        abort(404)
+
+    # Nama berbasis hash tidak pernah berganti isi: ETag kuat dari nama file.
+    # File lama bernama UUID memakai ETag bawaan dari mtime dan ukuran.
+    etag = os.path.splitext(os.path.basename(path))[0] if match else True
+    # conditional=True menangani If-None-Match (304) dan header Range (206)
+    response = send_file(os.path.abspath(path), conditional=True, etag=etag,
+                         max_age=config['UPLOAD_CACHE_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,32 @@
+import time
+from flask import Blueprint, Response, request, current_app
+import metrics as stage_metrics
+
+metrics = Blueprint('metrics', __name__)
+
+@metrics.before_app_request
+def start_timer():
+    request.start_time = time.perf_counter()
+    stage_metrics.start_request_timings()
+
+@metrics.after_app_request
+def record_request(response):
+    start = getattr(request, 'start_time', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.endpoint or 'unknown'
+    stage_metrics.REQUEST_SECONDS.observe(elapsed, endpoint)
+    stage_metrics.REQUESTS.inc(endpoint, request.method, str(response.status_code))
+
+    # Header Server-Timing per request (terlihat di tab Network DevTools)
+    if current_app.config['SERVER_TIMING']:
+        timings = stage_metrics.request_timings() or []
+        header = stage_metrics.server_timing_header(timings + [('total', elapsed)])
+        response.headers['Server-Timing'] = header
+    return response
+
+@metrics.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Format teks Prometheus; setiap worker gunicorn memiliki metrik sendiri
+    return Response(stage_metrics.render(), mimetype='text/plain; version=0.0.4')
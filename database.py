@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import make_transient_to_detached
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def engine_options(config):
+    """Opsi create_engine untuk SQLALCHEMY_ENGINE_OPTIONS, dihitung dari URI database aktif.
+
+    pool_recycle harus lebih pendek dari wait_timeout MySQL agar koneksi yang sudah
+    diputus server tidak dipakai ulang; pool_pre_ping memeriksa koneksi sebelum
+    dipinjam. SQLite tidak memakai QueuePool untuk database in-memory, sehingga
+    opsi ukuran pool hanya diberikan untuk database lain.
+    """
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options
+    options.update({
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    })
+    return options
+
+
+class UserCache:
+    """Cache nilai kolom Users per id dengan TTL pendek, untuk user_loader Flask-Login.
+
+    Yang disimpan adalah salinan nilai kolom, bukan instance ORM, karena instance
+    kedaluwarsa setelah commit di session request lain. Saat cache hit, instance
+    dibangun ulang dan digabungkan ke session tanpa query (merge load=False).
+    """
+
+    def __init__(self, ttl=30, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._values = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._values.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._values.pop(user_id, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, values):
+        with self._lock:
+            if len(self._values) >= self.max_size:
+                # Buang entri yang paling cepat kedaluwarsa
+                del self._values[min(self._values, key=lambda key: self._values[key][0])]
+            self._values[user_id] = (time.monotonic() + self.ttl, values)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._values.pop(user_id, None)
+
+
+def load_cached(session, model, cache, object_id):
+    """Mengembalikan instance model untuk object_id lewat cache; None bila tidak ada."""
+    values = cache.get(object_id) if cache else None
+    if values is not None:
+        instance = model(**values)
+        make_transient_to_detached(instance)
+        return session.merge(instance, load=False)
+
+    instance = session.get(model, object_id)
+    if instance is not None and cache:
+        cache.put(object_id, {column.key: getattr(instance, column.key) for column in model.__table__.columns})
+    return instance
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache(config):
+    """Mengembalikan cache pengguna, atau None bila USER_CACHE_TTL bernilai 0."""
+    global _user_cache
+    if not config['USER_CACHE_TTL']:
+        return None
+    with _user_cache_lock:
+        if _user_cache is None:
+            _user_cache = UserCache(config['USER_CACHE_TTL'], config['USER_CACHE_SIZE'])
+        return _user_cache
@@ -0,0 +1,130 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import correct_caption, get_gemini_caption, upload_image_file
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Enricher:
+    """Tahap pengayaan caption: koreksi teks, unggah gambar dan caption Gemini.
+
+    Semua panggilan memakai satu requests.Session dengan pool koneksi, timeout per
+    panggilan dan satu batas waktu total. Unggahan gambar berjalan di thread pool
+    bersamaan dengan inferensi model dan koreksi caption, tetapi baru dimulai setelah
+    inferensi diterima admission control. Bila batas waktu tercapai, tahap ini berhenti
+    dan memakai caption terbaik yang sudah ada (hasil koreksi, atau caption model bila
+    koreksi belum selesai).
+    """
+
+    def __init__(self, api_url, uploader_url, pool_size=10, connect_timeout=3.0,
+                 read_timeout=15.0, deadline=20.0, workers=8):
+        self.api_url = api_url
+        self.uploader_url = uploader_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='enrichment')
+
+    def _timeout(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+
+    def _upload(self, image_bytes, filename, content_type, deadline):
+        timeout = self._timeout(deadline)
+        if timeout is None:
+            return None
+        return upload_image_file(filename, image_bytes, content_type, session=self.session,
+                                 timeout=timeout, uploader_url=self.uploader_url)
+
+    def run(self, caption_fn, image_bytes, filename, content_type):
+        """Menjalankan caption_fn (inferensi model) dan pengayaan dalam batas waktu.
+
+        caption_fn menerima satu argumen, start_upload, yang dipanggilnya begitu
+        inferensi diterima admission control; unggahan gambar ke layanan eksternal baru
+        dimulai saat itu (atau setelah caption_fn selesai bila tidak dipanggil). Bila
+        caption_fn gagal, unggahan yang belum berjalan dibatalkan dan hasilnya diabaikan.
+        Batas waktu dihitung sejak pengayaan dimulai, bukan sejak request masuk antrian.
+
+        Mengembalikan dict berisi caption, corrected_caption, final_caption dan img_url
+        (None bila unggahan gagal atau batas waktu tercapai).
+        """
+        uploads = []
+        # Salinan context agar durasi unggahan ikut tercatat di Server-Timing request ini
+        context = contextvars.copy_context()
+
+        def start_upload():
+            if not uploads:
+                uploads.append(self._executor.submit(context.run, self._upload, image_bytes, filename,
+                                                     content_type, time.monotonic() + self.deadline))
+
+        try:
+            caption = caption_fn(start_upload)
+        except Exception:
+            for future in uploads:
+                future.cancel()
+            raise
+        start_upload()
+        upload_future = uploads[0]
+        deadline = time.monotonic() + self.deadline
+        result = {'caption': caption, 'corrected_caption': caption, 'final_caption': caption, 'img_url': None}
+
+        timeout = self._timeout(deadline)
+        if timeout is None:
+            logger.error("Batas waktu pengayaan habis sebelum koreksi caption, memakai caption model")
+            return result
+        corrected_caption = correct_caption(caption, session=self.session, timeout=timeout, api_url=self.api_url)
+        result['corrected_caption'] = result['final_caption'] = corrected_caption
+
+        try:
+            img_url = upload_future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            logger.error("Batas waktu pengayaan habis saat mengunggah gambar, memakai caption terkoreksi")
+            return result
+        if not img_url:
+            return result
+
+        timeout = self._timeout(deadline)
+        if timeout is None:
+            logger.error("Batas waktu pengayaan habis sebelum caption Gemini, memakai caption terkoreksi")
+            return result
+        gemini_caption = get_gemini_caption(img_url, corrected_caption, session=self.session,
+                                            timeout=timeout, api_url=self.api_url)
+        result['img_url'] = img_url
+        result['final_caption'] = gemini_caption if gemini_caption else corrected_caption
+        return result
+
+
+_enricher = None
+_enricher_lock = threading.Lock()
+
+
+def get_enricher(config):
+    global _enricher
+    with _enricher_lock:
+        if _enricher is None:
+            _enricher = Enricher(
+                api_url=config['NYXS_API_URL'],
+                uploader_url=config['UPLOADER_URL'],
+                pool_size=config['HTTP_POOL_SIZE'],
+                connect_timeout=config['HTTP_CONNECT_TIMEOUT'],
+                read_timeout=config['HTTP_READ_TIMEOUT'],
+                deadline=config['ENRICHMENT_DEADLINE'],
+                workers=config['ENRICHMENT_WORKERS']
+            )
+        return _enricher
@@ -0,0 +1,81 @@
+import logging
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def feature_key(image, digest=None):
+    # Grid fitur bergantung pada sisi terpanjang saat decode, bukan hanya pada isi file.
+    # digest menggantikan hash isi, misalnya hash byte asli untuk WebP yang tersimpan
+    return f'{digest or image.hash}_{image.max_side or 0}'
+
+
+class FeatureCache:
+    """Cache grid fitur ResNet50V2 7x7 (49 x 2048) per gambar, disimpan sebagai .npy float16.
+
+    Kunci entri adalah feature_key(image): hash isi ditambah sisi decode. Entri dari
+    backend inferensi yang berbeda (misalnya tflite terkuantisasi) disimpan di
+    subdirektori backend masing-masing. Setiap entri adalah satu file .npy (sekitar
+    196 KB dalam float16) di bawah direktori dua karakter pertama hash-nya, dibaca
+    dengan memory-map sehingga halaman file dibagi bersama antar worker lewat page cache.
+    """
+
+    def __init__(self, directory, dtype='float16', backend='eager'):
+        directory = os.path.join(directory, backend)
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.npy')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            features = np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError) as e:
+            logger.error(f"File fitur rusak {path}: {str(e)}")
+            return None
+        return np.asarray(features, dtype=np.float32)
+
+    def put(self, key, features):
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        # Tulis ke file sementara lalu rename agar pembaca tidak melihat file setengah jadi
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.asarray(features, dtype=self.dtype))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_feature_cache(config):
+    """Mengembalikan cache fitur sesuai konfigurasi, atau None bila FEATURE_CACHE_DIR kosong."""
+    global _cache
+    if not config['FEATURE_CACHE_DIR']:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = FeatureCache(config['FEATURE_CACHE_DIR'], config['FEATURE_CACHE_DTYPE'],
+                                  config['INFERENCE_BACKEND'])
+        return _cache
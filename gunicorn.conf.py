@@ -0,0 +1,21 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# MODEL_PRELOAD=true mengimpor kode aplikasi di master sebelum fork (TensorFlow tetap
+# belum diimpor) lalu memuat model di setiap worker saat boot. TensorFlow tidak aman
+# terhadap fork: worker yang di-fork setelah master menjalankan operasi TF bisa macet
+# pada operasi pertamanya, jadi model tidak pernah dimuat di master.
+# MODEL_WARMUP=true (tanpa preload) memuat model di setiap worker saat boot,
+# bukan saat request captioning pertama.
+preload_app = os.getenv('MODEL_PRELOAD', 'false').lower() == 'true'
+warm_up_workers = os.getenv('MODEL_WARMUP', 'false').lower() == 'true'
+
+
+def post_worker_init(worker):
+    if warm_up_workers or preload_app:
+        from model_registry import registry
+        registry.warm_up()
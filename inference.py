@@ -0,0 +1,185 @@
+import numpy as np
+import tensorflow as tf
+from ingest import IngestedImage
+from metrics import CAPTION_LENGTHS, CAPTION_TOKENS, DECODE_STEPS, DECODE_STOPS, timed
+from model_registry import registry
+
+# Thread pool TF diatur sebelum operasi pertama (preprocess bisa berjalan sebelum model dimuat)
+registry.configure_threads()
+
+def preprocess_pixels(pixels, size=224):
+    # Piksel RGB (H, W, 3) -> tensor input ResNet50V2 (1, size, size, 3)
+    with timed('preprocess'):
+        img = tf.image.resize(pixels, (size, size), method=tf.image.ResizeMethod.GAUSSIAN)
+        img = np.array(img)
+        img = tf.keras.applications.resnet_v2.preprocess_input(img)
+        img = np.expand_dims(img, axis=0)
+    return img
+
+def load_image_from_file(file):
+    return IngestedImage(file.read()).model_tensor()
+
+
+def reorder_cache(cache, beam_indices):
+    # Hanya K/V self-attention yang bergantung pada riwayat token setiap beam;
+    # K/V cross-attention sama untuk semua beam dari gambar yang sama.
+    return [
+        {'k': tf.gather(layer['k'], beam_indices), 'v': tf.gather(layer['v'], beam_indices),
+         'enc_k': layer['enc_k'], 'enc_v': layer['enc_v']}
+        for layer in cache
+    ]
+
+# Alasan berhentinya hipotesis, dicatat per gambar di seeimg_decode_stops_total
+STOP_REASONS = ('max_length', 'end', 'repetition', 'threshold')
+
+def repeated_ngram(sequences, n):
+    # True untuk hipotesis yang n-gram terakhirnya sudah muncul sebelumnya di hipotesis yang sama.
+    # Hanya kemunculan yang tidak tumpang tindih dengan n-gram terakhir yang dihitung, sehingga
+    # membuang n token terakhir tidak pernah memotong kemunculan pertamanya ("x x x" dengan n=2).
+    if sequences.shape[-1] < 2 * n:
+        return tf.zeros(tf.shape(sequences)[:2], dtype=tf.bool)
+    windows = tf.signal.frame(sequences, n, 1, axis=-1)
+    matches = tf.reduce_all(tf.equal(windows[:, :, :-n], windows[:, :, -1:]), axis=-1)
+    return tf.reduce_any(matches, axis=-1)
+
+def beam_search(img_features, beam_width=3, max_length=None, backend=None, repetition_ngram=0,
+                end_threshold=0.0):
+    """Beam search batch atas decoder dengan skor log-probabilitas ternormalisasi panjang.
+
+    img_features berukuran (batch, 49, 2048), grid 7x7 ResNet50V2. Semua hipotesis dari seluruh gambar
+    dijalankan sebagai satu tensor (batch * beam_width) per langkah decoding.
+    Mengembalikan (sequences, scores, attention_weights) dengan sequences berukuran
+    (batch, beam_width, panjang) yang diurutkan dari skor terbaik. backend default
+    adalah backend registry (lihat serving.py); max_length dibatasi oleh panjang
+    tabel posisi decoder (MAX_CAPTION_LENGTH).
+
+    Dua kontrol berhenti lebih awal (0 = nonaktif): repetition_ngram menghentikan
+    hipotesis yang mengulang n-gram terakhirnya dan membuang pengulangan itu, dan
+    end_threshold mengakhiri hipotesis begitu probabilitas <end> mencapai nilai tersebut.
+    """
+    backend = backend or registry.backend
+    tokenizer = registry.tokenizer
+    start_token = tokenizer.word_index['<start>']
+    end_token = tokenizer.word_index['<end>']
+
+    table_length = registry.max_caption_length
+    max_length = min(max_length or table_length, table_length)
+
+    batch_size = tf.shape(img_features)[0]
+
+    enc_output = backend.encode(img_features)
+    enc_output = tf.repeat(enc_output, beam_width, axis=0)
+    cache = backend.init_cache(enc_output)
+
+    sequences = tf.fill([batch_size, beam_width, 1], start_token)
+    # Pada langkah pertama semua beam identik, jadi hanya beam pertama yang dikembangkan
+    scores = tf.tile(tf.constant([[0.0] + [-np.inf] * (beam_width - 1)]), [batch_size, 1])
+    lengths = tf.zeros([batch_size, beam_width])
+    finished = tf.zeros([batch_size, beam_width], dtype=tf.bool)
+    stop_reasons = tf.zeros([batch_size, beam_width], dtype=tf.int32)
+    attention_weights = {}
+
+    # Konstanta per pencarian, dibuat sekali di luar loop decoding
+    end_only = None
+    batch_offsets = tf.range(batch_size)[:, tf.newaxis] * beam_width
+    log_end_threshold = np.log(end_threshold) if end_threshold > 0 else None
+
+    for i in range(max_length):
+        predictions, attention_weights, cache = backend.decode_step(
+            tf.reshape(sequences[:, :, -1], [-1, 1]), i, cache)
+        vocab_size = predictions.shape[-1]
+        log_probs = tf.reshape(tf.nn.log_softmax(predictions, axis=-1), [batch_size, beam_width, vocab_size])
+
+        # Beam yang sudah selesai hanya boleh "memperpanjang" dirinya dengan <end> tanpa biaya
+        if end_only is None:
+            end_only = tf.one_hot(end_token, vocab_size, on_value=0.0, off_value=-np.inf)
+        log_probs = tf.where(finished[:, :, tf.newaxis], end_only, log_probs)
+
+        # Hipotesis yang cukup yakin akan berakhir hanya boleh memilih <end>
+        forced = tf.zeros_like(finished)
+        if log_end_threshold is not None:
+            end_log_probs = log_probs[:, :, end_token]
+            forced = tf.logical_and(tf.logical_not(finished), end_log_probs >= log_end_threshold)
+            log_probs = tf.where(forced[:, :, tf.newaxis], end_only + end_log_probs[:, :, tf.newaxis], log_probs)
+
+        candidate_scores = scores[:, :, tf.newaxis] + log_probs
+        candidate_lengths = lengths + tf.cast(tf.logical_not(finished), tf.float32)
+        normalized = candidate_scores / candidate_lengths[:, :, tf.newaxis]
+
+        _, top_indices = tf.math.top_k(tf.reshape(normalized, [batch_size, -1]), k=beam_width)
+        beam_indices = top_indices // vocab_size
+        token_ids = top_indices % vocab_size
+
+        scores = tf.gather(tf.reshape(candidate_scores, [batch_size, -1]), top_indices, batch_dims=1)
+        lengths = tf.gather(candidate_lengths, beam_indices, batch_dims=1)
+        previously_finished = tf.gather(finished, beam_indices, batch_dims=1)
+        stop_reasons = tf.gather(stop_reasons, beam_indices, batch_dims=1)
+        forced = tf.gather(forced, beam_indices, batch_dims=1)
+        finished = tf.logical_or(previously_finished, token_ids == end_token)
+        sequences = tf.concat([tf.gather(sequences, beam_indices, batch_dims=1), token_ids[:, :, tf.newaxis]], axis=-1)
+
+        newly_finished = tf.logical_and(finished, tf.logical_not(previously_finished))
+        stop_reasons = tf.where(newly_finished, tf.where(forced, 3, 1), stop_reasons)
+
+        if repetition_ngram:
+            # n-gram yang berulang diganti <end>, sehingga caption berakhir sebelum pengulangan
+            looping = tf.logical_and(tf.logical_not(finished), repeated_ngram(sequences, repetition_ngram))
+            tail = tf.range(tf.shape(sequences)[-1]) >= tf.shape(sequences)[-1] - repetition_ngram
+            sequences = tf.where(tf.logical_and(looping[:, :, tf.newaxis], tail), end_token, sequences)
+            finished = tf.logical_or(finished, looping)
+            stop_reasons = tf.where(looping, 2, stop_reasons)
+
+        flat_indices = tf.reshape(beam_indices + batch_offsets, [-1])
+        cache = reorder_cache(cache, flat_indices)
+
+        if bool(tf.reduce_all(finished)):
+            break
+
+    DECODE_STEPS.observe(i + 1)
+    for reason in stop_reasons[:, 0].numpy():
+        DECODE_STOPS.inc(STOP_REASONS[reason])
+    return sequences, scores / lengths, attention_weights
+
+def sequence_to_words(sequence):
+    tokenizer = registry.tokenizer
+    end_token = tokenizer.word_index['<end>']
+
+    result = []
+    for predicted_id in sequence[1:]:
+        if predicted_id == end_token:
+            break
+        result.append(tokenizer.index_word[predicted_id])
+    return result
+
+def extract_features(image_tensors):
+    # (batch, 224, 224, 3) -> grid fitur ResNet50V2 7x7 (batch, 49, 2048)
+    with timed('features'):
+        return registry.backend.extract_features(image_tensors)
+
+def evaluate_beam_search(image_tensor, beam_width=3):
+    img_tensor_val = extract_features(image_tensor)
+
+    sequences, _, attention_weights = beam_search(img_tensor_val, beam_width)
+
+    best = sequences[0, 0].numpy().tolist()
+    result = sequence_to_words(best)
+    output = tf.constant(best[:len(result) + 1])
+
+    return result, output, attention_weights
+
+def caption_features(img_features, beam_width=3, max_length=None, repetition_ngram=0, end_threshold=0.0):
+    # Satu caption (list kata) per gambar dari grid fitur yang sudah diekstrak;
+    # beam_width=1 adalah greedy decoding
+    with timed('beam_search'):
+        sequences, _, _ = beam_search(tf.convert_to_tensor(img_features, dtype=tf.float32), beam_width, max_length,
+                                      repetition_ngram=repetition_ngram, end_threshold=end_threshold)
+
+    captions = [sequence_to_words(best) for best in sequences[:, 0].numpy().tolist()]
+    for caption in captions:
+        CAPTION_TOKENS.observe(len(caption))
+        CAPTION_LENGTHS.inc(len(caption))
+    return captions
+
+def evaluate_beam_search_batch(image_tensors, beam_width=3):
+    # image_tensors: (batch, 224, 224, 3), satu caption (list kata) per gambar
+    return caption_features(extract_features(image_tensors), beam_width)
@@ -0,0 +1,86 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image as PILImage, UnidentifiedImageError
+
+from caption_cache import content_hash
+from metrics import timed
+from utils import VALID_IMAGE_FORMATS
+
+
+class IngestedImage:
+    """Satu gambar unggahan yang dibaca sekali dan di-decode sekali.
+
+    Byte asli dipakai untuk hash cache dan payload uploader; gambar RGB hasil decode
+    dipakai bersama untuk tensor model 224x224 dan file WebP, tanpa file sementara
+    dan tanpa membaca atau men-decode ulang dari disk.
+
+    Bila max_side diberikan, gambar diperkecil sebelum/selagi di-decode: JPEG
+    di-decode langsung pada skala DCT tereduksi (draft), format lain diperkecil
+    dengan reduce() bertingkat. max_pixels membatasi jumlah piksel berdasarkan
+    header, sebelum decode, untuk menolak decompression bomb.
+    """
+
+    def __init__(self, data, filename='image.jpg', content_type='image/jpeg', max_side=None, max_pixels=None):
+        self.data = data
+        self.filename = filename
+        self.content_type = content_type
+        self.max_side = max_side
+        self.max_pixels = max_pixels
+        self._hash = None
+        self._image = None
+        self.format = None
+        self.original_size = None
+
+    @classmethod
+    def from_upload(cls, file, max_side=None, max_pixels=None):
+        # Stream langsung dari request.files, tanpa menyimpan file asli ke disk
+        return cls(file.read(), file.filename, file.content_type, max_side=max_side, max_pixels=max_pixels)
+
+    @property
+    def hash(self):
+        if self._hash is None:
+            self._hash = content_hash(self.data)
+        return self._hash
+
+    @property
+    def image(self):
+        """Gambar RGB hasil decode (di-cache setelah decode pertama)."""
+        if self._image is None:
+            with timed('decode'):
+                self._image = self._decode()
+        return self._image
+
+    def _decode(self):
+        try:
+            img = PILImage.open(BytesIO(self.data))
+        except (UnidentifiedImageError, PILImage.DecompressionBombError):
+            raise ValueError("File gambar tidak valid")
+        # Decoder dipilih dari isi file (magic bytes), bukan dari ekstensi atau content type
+        if img.format is None or img.format.lower() not in VALID_IMAGE_FORMATS:
+            raise ValueError("Format gambar tidak valid")
+        self.format = img.format.lower()
+        self.original_size = img.size
+
+        width, height = img.size
+        if self.max_pixels and width * height > self.max_pixels:
+            raise ValueError("Resolusi gambar terlalu besar")
+
+        if self.max_side and max(width, height) > self.max_side:
+            if self.format in ("jpeg", "jpg"):
+                # Decode JPEG pada skala 1/2, 1/4 atau 1/8 yang masih >= max_side
+                img.draft('RGB', (self.max_side, self.max_side))
+            img = img.convert('RGB')
+            img.thumbnail((self.max_side, self.max_side), PILImage.BICUBIC, reducing_gap=2.0)
+            return img
+        return img.convert('RGB')
+
+    @property
+    def pixels(self):
+        # Tampilan numpy (H, W, 3) uint8 dari buffer piksel yang sama
+        return np.asarray(self.image)
+
+    def model_tensor(self):
+        from inference import preprocess_pixels
+
+        return preprocess_pixels(self.pixels)
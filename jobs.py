@@ -0,0 +1,65 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from extensions import db
+from models import Images
+from pipeline import run_upload_pipeline
+from similarity import get_similarity_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = 'pending'
+JOB_PROCESSING = 'processing'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class CaptionJobQueue:
+    """Antrian job captioning yang dikerjakan pool thread terpisah dari thread request.
+
+    Route /images menyimpan baris Images berstatus pending lalu langsung merespons;
+    pekerja di sini mengisi predicted_caption dan memperbarui status baris tersebut.
+    """
+
+    def __init__(self, workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='caption-job')
+
+    def submit(self, app, image_id, image, user_id=None):
+        return self._executor.submit(self._run, app, image_id, image, user_id)
+
+    def _set_status(self, image_id, status, caption=None):
+        image = Images.query.get(image_id)
+        if image is None:
+            # Gambar dihapus pengguna sebelum job selesai
+            return
+        image.status = status
+        if caption is not None:
+            image.predicted_caption = caption
+        db.session.commit()
+
+    def _run(self, app, image_id, image, user_id=None):
+        with app.app_context():
+            try:
+                self._set_status(image_id, JOB_PROCESSING)
+                caption, embedding, _ = run_upload_pipeline(image, user_id, background=True)
+                self._set_status(image_id, JOB_DONE, caption)
+                if embedding is not None:
+                    get_similarity_index(app.config).add(user_id, image_id, embedding)
+            except Exception as e:
+                logger.error(f"Kesalahan job caption {image_id}: {str(e)}")
+                db.session.rollback()
+                self._set_status(image_id, JOB_FAILED)
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue(config):
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = CaptionJobQueue(config['CAPTION_JOB_WORKERS'])
+        return _job_queue
@@ -0,0 +1,188 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Batas bucket default (detik), mirip default klien Prometheus tetapi diperpanjang
+# sampai 60 detik karena satu caption lengkap bisa memakan waktu puluhan detik
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in pairs]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # labels -> [jumlah per bucket (non-kumulatif), total nilai, jumlah observasi]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                    lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+                label_text = _format_labels(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+                lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+STAGE_SECONDS = Histogram('seeimg_stage_duration_seconds', 'Durasi tiap tahap pipeline captioning.', ['stage'])
+REQUEST_SECONDS = Histogram('seeimg_request_duration_seconds', 'Durasi request HTTP.', ['endpoint'])
+REQUESTS = Counter('seeimg_requests_total', 'Jumlah request HTTP.', ['endpoint', 'method', 'status'])
+STAGE_ERRORS = Counter('seeimg_stage_errors_total', 'Jumlah tahap pipeline yang gagal.', ['stage'])
+DECODE_STEPS = Histogram('seeimg_decode_steps', 'Jumlah langkah decoding per beam search.',
+                         buckets=(5, 10, 15, 20, 30, 50, 75, 100))
+CAPTION_TOKENS = Histogram('seeimg_caption_tokens', 'Jumlah token per caption yang dihasilkan.',
+                           buckets=(3, 5, 8, 10, 15, 20, 30, 50, 100))
+INFERENCE_ACTIVE = Gauge('seeimg_inference_active', 'Jumlah inferensi yang sedang berjalan.')
+INFERENCE_WAITING = Gauge('seeimg_inference_waiting', 'Jumlah request yang menunggu slot inferensi.')
+INFERENCE_REJECTED = Counter('seeimg_inference_rejected_total', 'Request inferensi yang ditolak (503).', ['reason'])
+DECODE_STOPS = Counter('seeimg_decode_stops_total', 'Alasan berhentinya decoding caption terbaik.', ['reason'])
+# Hitungan persis per panjang caption (token), dasar statistik GET /captioning/lengths
+CAPTION_LENGTHS = Counter('seeimg_caption_length_total', 'Jumlah caption per panjang token.', ['tokens'])
+
+METRICS = [REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, STAGE_ERRORS, DECODE_STEPS, CAPTION_TOKENS,
+           INFERENCE_ACTIVE, INFERENCE_WAITING, INFERENCE_REJECTED, DECODE_STOPS, CAPTION_LENGTHS]
+
+
+def length_distribution():
+    """Ringkasan distribusi panjang caption dan alasan berhenti decoding sejak worker dimulai."""
+    counts = {int(labels[0]): count for labels, count in CAPTION_LENGTHS.values().items()}
+    total = sum(counts.values())
+    summary = {'count': total, 'lengths': {str(length): counts[length] for length in sorted(counts)},
+               'stops': {labels[0]: count for labels, count in DECODE_STOPS.values().items()}}
+    if total:
+        summary['mean'] = sum(length * count for length, count in counts.items()) / total
+        summary['max'] = max(counts)
+        cumulative = 0
+        quantiles = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+        for length in sorted(counts):
+            cumulative += counts[length]
+            for name, q in list(quantiles.items()):
+                if cumulative >= q * total:
+                    summary[name] = length
+                    del quantiles[name]
+    return summary
+
+# Daftar (tahap, detik) milik request yang sedang berjalan, untuk header Server-Timing.
+# Memakai contextvar agar thread pool yang menyalin context (lihat Enricher) ikut tercatat.
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request_timings():
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+def request_timings():
+    return _request_timings.get()
+
+
+def record_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage):
+    """Mengukur satu tahap ke histogram seeimg_stage_duration_seconds (dan Server-Timing request)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage)
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def server_timing_header(timings):
+    # Tahap yang sama (misalnya beberapa panggilan upstream) dijumlahkan
+    totals = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ', '.join(f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in totals.items())
+
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 'seeimg-caption-model'
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+WEIGHTS_NAME = 'weights.bin'
+VOCAB_NAME = 'vocab.npy'
+# Setiap tensor dimulai pada offset kelipatan 64 byte (satu cache line, cukup untuk SIMD)
+ALIGNMENT = 64
+
+
+class Vocabulary:
+    """Pengganti Tokenizer Keras untuk inferensi: index_word berupa list (id -> kata).
+
+    Hanya atribut yang dipakai decoding yang disediakan: index_word[id] dan
+    word_index[kata] untuk token khusus seperti <start> dan <end>.
+    """
+
+    def __init__(self, words):
+        self.index_word = list(words)
+        self.word_index = {word: i for i, word in enumerate(self.index_word) if word}
+
+    def __len__(self):
+        return len(self.index_word)
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer):
+        words = [''] * (max(tokenizer.index_word) + 1)
+        for i, word in tokenizer.index_word.items():
+            words[i] = word
+        return cls(words)
+
+
+def artifact_exists(path):
+    return bool(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+
+def write_artifact(path, networks, vocabulary, hyperparameters):
+    """Menulis artifact model ke direktori path.
+
+    networks adalah dict nama -> model Keras (misalnya 'resnet' dan 'transformer');
+    bobot setiap variabel ditulis berurutan ke weights.bin dengan offset tercatat di
+    manifest.json. Manifest ditulis paling akhir, sehingga artifact yang terputus di
+    tengah jalan tidak pernah terbaca sebagai artifact lengkap.
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    digest = hashlib.sha256()
+    offset = 0
+    tensors = {}
+    weights_tmp = os.path.join(path, f'{WEIGHTS_NAME}.tmp')
+    with open(weights_tmp, 'wb') as f:
+        for network, model in networks.items():
+            entries = tensors[network] = []
+            for variable in model.weights:
+                value = np.ascontiguousarray(np.asarray(variable.numpy()))
+                padding = -offset % ALIGNMENT
+                f.write(b'\0' * padding)
+                offset += padding
+                data = value.tobytes()
+                f.write(data)
+                digest.update(data)
+                entries.append({'name': variable.path, 'dtype': value.dtype.str, 'shape': list(value.shape),
+                                'offset': offset})
+                offset += len(data)
+    os.replace(weights_tmp, os.path.join(path, WEIGHTS_NAME))
+
+    # Byte UTF-8 lebar tetap: empat kali lebih kecil dari array unicode NumPy
+    words = np.array([word.encode('utf-8') for word in vocabulary.index_word], dtype=bytes)
+    vocab_tmp = os.path.join(path, f'{VOCAB_NAME}.tmp.npy')
+    np.save(vocab_tmp, words)
+    os.replace(vocab_tmp, os.path.join(path, VOCAB_NAME))
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'version': ARTIFACT_VERSION,
+        'model_version': digest.hexdigest()[:16],
+        'hyperparameters': hyperparameters,
+        'weights_bytes': offset,
+        'vocab_size': len(words),
+        'tensors': tensors,
+    }
+    manifest_tmp = f'{manifest_path}.tmp'
+    with open(manifest_tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(manifest_tmp, manifest_path)
+    return manifest
+
+
+class ModelArtifact:
+    """Artifact model yang dibaca lewat memory map: manifest.json, weights.bin dan vocab.npy.
+
+    weights.bin dipetakan read-only dan dibaca langsung ke variabel TensorFlow tanpa
+    parsing HDF5 maupun unduhan bobot ImageNet. Yang dibagi antar worker hanya page
+    cache file tersebut: variable.assign menyalin bobot ke memori privat setiap proses.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"Bukan artifact model: {path}")
+        if self.manifest.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Versi artifact model {self.manifest.get('version')} tidak didukung "
+                             f"(diharapkan {ARTIFACT_VERSION}); buat ulang dengan tools/build_model_artifact.py")
+        weights_path = os.path.join(path, WEIGHTS_NAME)
+        if os.path.getsize(weights_path) != self.manifest['weights_bytes']:
+            raise ValueError(f"Ukuran {weights_path} tidak sesuai manifest; artifact rusak atau tidak lengkap")
+        self._weights = np.memmap(weights_path, dtype=np.uint8, mode='r')
+
+    @property
+    def model_version(self):
+        return self.manifest['model_version']
+
+    @property
+    def hyperparameters(self):
+        return self.manifest['hyperparameters']
+
+    def arrays(self, network):
+        # View read-only ke memory map; tidak ada salinan sampai ditulis ke variabel
+        for entry in self.manifest['tensors'][network]:
+            dtype = np.dtype(entry['dtype'])
+            count = int(np.prod(entry['shape'], dtype=np.int64))
+            yield entry['name'], np.frombuffer(self._weights, dtype, count, entry['offset']).reshape(entry['shape'])
+
+    def assign(self, network, model):
+        """Mengisi variabel model (yang sudah dibangun) dengan bobot network dari artifact."""
+        variables = model.weights
+        entries = self.manifest['tensors'][network]
+        if len(entries) != len(variables):
+            raise ValueError(f"Artifact berisi {len(entries)} tensor {network}, model memiliki {len(variables)}")
+        for (name, value), variable in zip(self.arrays(network), variables):
+            if tuple(variable.shape) != value.shape:
+                raise ValueError(f"Bentuk tensor {name} di artifact {value.shape} tidak sesuai "
+                                 f"variabel {variable.path} {tuple(variable.shape)}")
+            variable.assign(value)
+
+    def vocabulary(self):
+        words = np.load(os.path.join(self.path, VOCAB_NAME), mmap_mode='r')
+        return Vocabulary(word.decode('utf-8') for word in words.tolist())
@@ -0,0 +1,225 @@
+import logging
+import os
+import pickle
+import threading
+import time
+
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Define model parameters
+top_k = 1732
+num_layer = 2
+d_model = 128
+dff = 2048
+num_heads = 2
+row_size = 8
+col_size = 8
+target_vocab_size = top_k + 1
+dropout_rate = 0.1
+
+# Dicatat di manifest artifact model dan dicocokkan saat dimuat
+HYPERPARAMETERS = {
+    'top_k': top_k,
+    'num_layer': num_layer,
+    'd_model': d_model,
+    'dff': dff,
+    'num_heads': num_heads,
+    'row_size': row_size,
+    'col_size': col_size,
+    'target_vocab_size': target_vocab_size,
+}
+
+
+class ModelRegistry:
+    """Memuat ResNet50V2, Transformer dan tokenizer sekali saja, saat pertama dibutuhkan.
+
+    TensorFlow baru diimpor ketika model pertama kali diakses, sehingga halaman yang
+    tidak melakukan captioning (login, register) tidak ikut menanggung biayanya.
+    Panggil warm_up() di setiap worker setelah fork (post_worker_init di
+    gunicorn.conf.py), jangan di master: TensorFlow tidak aman terhadap fork, dan
+    setiap worker memegang salinan bobotnya sendiri.
+
+    backend memilih cara model dijalankan (lihat serving.py): 'eager', 'graph'
+    (tf.function) atau 'tflite' (feature extractor terkuantisasi). Dengan 'tflite'
+    dan file .tflite yang sudah ada, ResNet50V2 Keras tidak dibangun sama sekali.
+
+    Bila artifact_dir berisi artifact model (lihat model_artifact.py), bobot kedua
+    jaringan dan kosakata dibaca dari artifact tersebut lewat memory map, tanpa
+    pickle tokenizer, file .h5 maupun unduhan bobot ImageNet. Memory map hanya
+    mempercepat pemuatan dan berbagi page cache file; variabel TensorFlow tetap
+    berupa salinan di memori setiap proses.
+    """
+
+    def __init__(self, weights_path='./assets/model.weights.h5', tokenizer_path='./assets/tokenizer.pickle',
+                 backend='eager', tflite_dir='instance', tflite_quantization='float16', tflite_threads=None,
+                 max_caption_length=100, intra_op_threads=0, inter_op_threads=0, max_concurrent=1,
+                 artifact_dir=None, resnet_weights='imagenet'):
+        self.weights_path = weights_path
+        self.tokenizer_path = tokenizer_path
+        self.artifact_dir = artifact_dir
+        # 'imagenet' (diunduh Keras bila belum ada di ~/.keras) atau path file .h5 lokal
+        self.resnet_weights = resnet_weights
+        self.model_version = None
+        self.backend_name = backend
+        self.tflite_dir = tflite_dir
+        self.tflite_quantization = tflite_quantization
+        self.tflite_threads = tflite_threads
+        self.max_caption_length = max_caption_length
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.max_concurrent = max_concurrent
+        self._threads_configured = False
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._feature_extractor = None
+        self._transformer = None
+        self._tokenizer = None
+        self._backend = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def configure_threads(self):
+        """Membagi core CPU rata di antara slot inferensi agar thread TF tidak saling berebut.
+
+        Harus dipanggil sebelum operasi TensorFlow pertama; setelah runtime TF
+        berjalan, ukuran thread pool tidak dapat diubah lagi.
+        """
+        if self._threads_configured:
+            return
+        self._threads_configured = True
+        import tensorflow as tf
+
+        intra = self.intra_op_threads or max(1, (os.cpu_count() or 1) // max(1, self.max_concurrent))
+        inter = self.inter_op_threads or 1
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(intra)
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+            logger.info(f"Thread TensorFlow: intra-op {intra}, inter-op {inter}")
+        except RuntimeError as e:
+            logger.warning(f"Thread TensorFlow tidak dapat diatur (runtime sudah berjalan): {str(e)}")
+
+    def _load(self):
+        self.configure_threads()
+        import tensorflow as tf
+        from tensorflow.keras.applications import ResNet50V2
+        from tensorflow.keras.models import Model
+        from model_artifact import ModelArtifact, artifact_exists
+        from serving import create_backend, tflite_model_path
+        from transformer import Transformer
+
+        start = time.perf_counter()
+
+        artifact = ModelArtifact(self.artifact_dir) if artifact_exists(self.artifact_dir) else None
+        if artifact and artifact.hyperparameters != HYPERPARAMETERS:
+            raise ValueError(f"Hyperparameter artifact model {self.artifact_dir} tidak sesuai model_registry: "
+                             f"{artifact.hyperparameters}")
+
+        tflite_path = tflite_model_path(self.tflite_dir, self.tflite_quantization)
+        if self.backend_name != 'tflite' or not os.path.exists(tflite_path):
+            # Initialize and load models; dengan artifact, bobot diisi dari sana tanpa unduhan ImageNet
+            image_model = ResNet50V2(include_top=False, weights=None if artifact else self.resnet_weights)
+            self._feature_extractor = Model(image_model.input, image_model.layers[-1].output)
+            if artifact:
+                artifact.assign('resnet', self._feature_extractor)
+
+        if artifact:
+            self._tokenizer = artifact.vocabulary()
+        else:
+            # Load the saved tokenizer
+            with open(self.tokenizer_path, 'rb') as f:
+                self._tokenizer = pickle.load(f)
+
+        transformer = Transformer(
+            num_layer,
+            d_model,
+            num_heads,
+            dff,
+            row_size,
+            col_size,
+            target_vocab_size,
+            # Posisi hanya dipakai sampai panjang caption maksimum, bukan sebanyak kosakata
+            max_pos_encoding=self.max_caption_length,
+            rate=dropout_rate
+        )
+
+        # Dummy call to create the model variables
+        dummy_input = tf.zeros((1, row_size * col_size, 2048))
+        dummy_target = tf.zeros((1, 1), dtype=tf.int32)
+        _ = transformer(dummy_input, dummy_target, training=False)
+
+        if artifact:
+            artifact.assign('transformer', transformer)
+            self.model_version = artifact.model_version
+        else:
+            # Load pre-trained weights
+            transformer.load_weights(self.weights_path)
+        self._transformer = transformer
+
+        self._backend = create_backend(self.backend_name, self._feature_extractor, transformer,
+                                       tflite_path, self.tflite_quantization, self.tflite_threads)
+        if self.backend_name == 'tflite':
+            # Setelah konversi, bobot ResNet50V2 float32 tidak dibutuhkan lagi
+            self._feature_extractor = None
+
+        source = f"artifact {self.model_version}" if artifact else "h5"
+        logger.info(f"Model captioning (backend {self.backend_name}, {source}) dimuat dalam "
+                    f"{time.perf_counter() - start:.1f} detik")
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+        return self
+
+    @property
+    def feature_extractor(self):
+        # None pada backend 'tflite'; gunakan backend.extract_features
+        return self.ensure_loaded()._feature_extractor
+
+    @property
+    def backend(self):
+        return self.ensure_loaded()._backend
+
+    @property
+    def transformer(self):
+        return self.ensure_loaded()._transformer
+
+    @property
+    def tokenizer(self):
+        return self.ensure_loaded()._tokenizer
+
+    def warm_up(self):
+        """Memuat model dan menjalankan satu inferensi kosong agar request pertama tidak lambat."""
+        import tensorflow as tf
+
+        backend = self.ensure_loaded()._backend
+        start = time.perf_counter()
+
+        # Pada backend 'graph' dan 'tflite' ini sekaligus men-trace semua tf.function
+        features = backend.extract_features(tf.zeros((1, 224, 224, 3)))
+        enc_output = backend.encode(features)
+        cache = backend.init_cache(enc_output)
+        start_token = self._tokenizer.word_index['<start>']
+        backend.decode_step(tf.constant([[start_token]]), 0, cache)
+
+        logger.info(f"Warm-up model selesai dalam {time.perf_counter() - start:.1f} detik")
+
+
+registry = ModelRegistry(
+    backend=Config.INFERENCE_BACKEND,
+    tflite_dir=Config.TFLITE_MODEL_DIR,
+    tflite_quantization=Config.TFLITE_QUANTIZATION,
+    tflite_threads=Config.TFLITE_NUM_THREADS,
+    max_caption_length=Config.MAX_CAPTION_LENGTH,
+    intra_op_threads=Config.TF_INTRA_OP_THREADS,
+    inter_op_threads=Config.TF_INTER_OP_THREADS,
+    max_concurrent=Config.INFERENCE_MAX_CONCURRENT,
+    artifact_dir=Config.MODEL_ARTIFACT_DIR,
+)
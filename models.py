@@ -8,8 +8,17 @@ class Users(UserMixin, db.Model):
     password = db.Column(db.String(150), nullable=False)
 
 class Images(db.Model):
+    # Indeks untuk pagination keyset riwayat per pengguna (lihat GET /images) dan
+    # indeks FULLTEXT caption untuk GET /images/search (hanya MySQL, lihat search.py)
+    __table_args__ = (
+        db.Index('ix_images_user_date_id', 'user_id', 'upload_date', 'id'),
+        db.Index('ix_images_caption_fulltext', 'predicted_caption', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     image_path = db.Column(db.String(255), nullable=False)
     predicted_caption = db.Column(db.String(1000))
     upload_date = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    # Status job captioning asinkron: pending, processing, done atau failed
+    status = db.Column(db.String(20), nullable=False, default='done')
@@ -0,0 +1,132 @@
+import time
+
+from flask import current_app
+
+from admission import Overloaded, get_admission_controller
+from batcher import generate_caption
+from caption_cache import get_caption_cache
+from caption_modes import choose_mode, latency_tracker, run_fast_caption
+from enrichment import get_enricher
+from extensions import db
+from feature_cache import feature_key, get_feature_cache
+from similarity import get_similarity_index, image_features, pool_embedding
+from storage import get_upload_store
+
+
+def run_caption_pipeline(image, background=False, options=None, features=None, lookup_cache=True):
+    """Pipeline captioning lengkap untuk satu IngestedImage: cache caption, model, lalu pengayaan.
+
+    Dipakai oleh route /captioning, /images dan pekerja job asinkron (background=True);
+    membutuhkan application context Flask. options menimpa argumen decoding default;
+    caption dengan opsi khusus tidak dibaca dari maupun disimpan ke cache caption.
+    features adalah grid fitur ResNet yang sudah dihitung, agar tidak diekstrak ulang.
+    lookup_cache=False dipakai pemanggil yang sudah memeriksa cache caption sendiri.
+    """
+    config = current_app.config
+
+    # Gambar yang sama persis tidak perlu diproses ulang oleh model maupun layanan eksternal
+    cache = get_caption_cache(config) if not options else None
+    cached = cache.get(image.data) if cache and lookup_cache else None
+    if cached:
+        return cached['final_caption']
+
+    def model_caption(start_upload):
+        tensor = image.model_tensor() if features is None else None
+        caption = generate_caption(tensor, cache_key=feature_key(image), background=background, options=options,
+                                   features=features, on_admitted=start_upload)
+        return ' '.join([word for word in caption if word != "<unk>"])
+
+    # Unggahan gambar berjalan bersamaan dengan inferensi model (setelah admission) dan koreksi caption
+    result = get_enricher(config).run(model_caption, image.data, image.filename, image.content_type)
+
+    # Hanya hasil lengkap yang disimpan, agar gangguan sementara di uploader tidak ikut tersimpan
+    if cache and result['img_url']:
+        cache.put(image.data, result['caption'], result['corrected_caption'], result['final_caption'])
+
+    return result['final_caption']
+
+
+def run_upload_pipeline(image, user_id, background=False):
+    """Caption untuk unggahan riwayat; mengembalikan (caption, embedding, id gambar duplikat).
+
+    Gambar yang caption-nya sudah ada di cache caption tidak melewati model sama sekali;
+    embedding-nya diambil dari cache fitur atau disalin dari baris lain dengan file
+    yang sama (None bila keduanya tidak ada). Selain itu, bila indeks kemiripan aktif,
+    grid fitur dihitung lebih dulu dan di-pool menjadi embedding. Unggahan yang hampir
+    identik dengan gambar pengguna yang sudah selesai (cosine >= SIMILARITY_DUPLICATE_THRESHOLD)
+    memakai ulang caption gambar tersebut; selain itu pipeline lengkap dijalankan dengan
+    grid fitur yang sama. embedding ditambahkan ke indeks oleh pemanggil setelah baris
+    Images tersimpan.
+    """
+    from jobs import JOB_DONE
+    from models import Images
+
+    config = current_app.config
+    index = get_similarity_index(config)
+    if index is None:
+        return run_caption_pipeline(image, background), None, None
+
+    cache = get_caption_cache(config)
+    cached = cache.get(image.data) if cache else None
+    if cached:
+        return cached['final_caption'], _known_embedding(index, image), None
+
+    features = image_features(image, background)
+    embedding = pool_embedding(features)
+    match = index.near_duplicate(user_id, embedding, config['SIMILARITY_DUPLICATE_THRESHOLD'])
+    if match:
+        original = db.session.get(Images, match[0])
+        if original is not None and original.user_id == user_id and original.status == JOB_DONE \
+                and original.predicted_caption:
+            return original.predicted_caption, embedding, original.id
+    return run_caption_pipeline(image, background, features=features), embedding, None
+
+
+def _known_embedding(index, image):
+    # Tanpa ekstraksi fitur: dari cache fitur, atau dari gambar lain dengan isi (dan path) yang sama
+    from models import Images
+
+    feature_cache = get_feature_cache(current_app.config)
+    features = feature_cache.get(feature_key(image)) if feature_cache else None
+    if features is not None:
+        return pool_embedding(features)
+    path = get_upload_store(current_app.config).path_for(image.hash)
+    for image_id, user_id in db.session.query(Images.id, Images.user_id).filter_by(image_path=path).limit(20):
+        embedding = index.user(user_id).embedding(image_id)
+        if embedding is not None:
+            return embedding
+    return None
+
+
+def run_caption_with_mode(image, mode=None, budget_ms=None, options=None):
+    """Menjalankan pipeline lengkap atau mode cepat; mengembalikan (caption, mode yang dipakai).
+
+    mode None memakai CAPTION_MODE dan budget_ms None memakai CAPTION_LATENCY_BUDGET_MS.
+    Pada mode 'auto', request yang ditolak admission control dicoba sekali lagi
+    dengan mode cepat yang memakai slot inferensi jauh lebih singkat. Caption lengkap
+    dari cache caption dikembalikan sebagai 'full' pada mode apa pun; durasinya tidak
+    dicatat ke latency_tracker karena model tidak berjalan.
+    """
+    config = current_app.config
+    cache = get_caption_cache(config) if not options else None
+    cached = cache.get(image.data) if cache else None
+    if cached:
+        return cached['final_caption'], 'full'
+
+    mode = mode or config['CAPTION_MODE']
+    if budget_ms is None:
+        budget_ms = config['CAPTION_LATENCY_BUDGET_MS']
+    selected = choose_mode(mode, budget_ms, get_admission_controller(config))
+
+    start = time.perf_counter()
+    if selected == 'full':
+        try:
+            caption = run_caption_pipeline(image, options=options, lookup_cache=False)
+        except Overloaded:
+            if mode != 'auto':
+                raise
+            caption, selected = run_fast_caption(image, options=options), 'fast'
+    else:
+        caption = run_fast_caption(image, options=options)
+    latency_tracker.observe(selected, time.perf_counter() - start)
+    return caption, selected
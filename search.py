@@ -0,0 +1,239 @@
+import logging
+import math
+import re
+import threading
+
+from sqlalchemy import event, text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEARCH_BACKENDS = ('auto', 'mysql', 'sqlite_fts', 'memory')
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(value):
+    return TOKEN_PATTERN.findall((value or '').lower())
+
+
+class MySQLFullTextSearch:
+    """Pencarian memakai indeks FULLTEXT MySQL pada images.predicted_caption.
+
+    Semua kata wajib ada (BOOLEAN MODE, kata terakhir sebagai prefiks), sedangkan
+    peringkat memakai skor relevansi NATURAL LANGUAGE MODE. Indeks dipelihara MySQL
+    sendiri pada setiap INSERT/UPDATE/DELETE.
+    """
+
+    name = 'mysql'
+
+    def search(self, session, user_id, terms, limit, offset):
+        boolean = ' '.join(f'+{term}' for term in terms) + '*'
+        rows = session.execute(text(
+            "SELECT id, MATCH (predicted_caption) AGAINST (:natural IN NATURAL LANGUAGE MODE) AS score "
+            "FROM images WHERE user_id = :user_id "
+            "AND MATCH (predicted_caption) AGAINST (:boolean IN BOOLEAN MODE) "
+            "ORDER BY score DESC, id DESC LIMIT :limit OFFSET :offset"
+        ), {'natural': ' '.join(terms), 'boolean': boolean, 'user_id': user_id, 'limit': limit, 'offset': offset})
+        return [(row.id, float(row.score)) for row in rows]
+
+
+class SQLiteFTSSearch:
+    """Pencarian memakai tabel virtual FTS5 (external content) yang mengikuti tabel images.
+
+    Tabel dan trigger insert/update/delete dibuat saat pencarian pertama, lalu isi
+    lama dibangun ulang sekali; setelah itu indeks diperbarui oleh trigger SQLite
+    di setiap perubahan baris, termasuk dari pekerja job dan tools/bulk_caption.py.
+    """
+
+    name = 'sqlite_fts'
+
+    SCHEMA = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5("
+        "predicted_caption, content='images', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS images_fts_insert AFTER INSERT ON images BEGIN "
+        "INSERT INTO images_fts(rowid, predicted_caption) VALUES (new.id, new.predicted_caption); END",
+        "CREATE TRIGGER IF NOT EXISTS images_fts_delete AFTER DELETE ON images BEGIN "
+        "INSERT INTO images_fts(images_fts, rowid, predicted_caption) VALUES ('delete', old.id, old.predicted_caption); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS images_fts_update AFTER UPDATE OF predicted_caption ON images BEGIN "
+        "INSERT INTO images_fts(images_fts, rowid, predicted_caption) VALUES ('delete', old.id, old.predicted_caption); "
+        "INSERT INTO images_fts(rowid, predicted_caption) VALUES (new.id, new.predicted_caption); END",
+    ]
+
+    def __init__(self):
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def ensure(self, session):
+        with self._lock:
+            if self._ready:
+                return
+            connection = session.connection()
+            exists = connection.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'images_fts'")).first()
+            for statement in self.SCHEMA:
+                connection.execute(text(statement))
+            if not exists:
+                connection.execute(text("INSERT INTO images_fts(images_fts) VALUES ('rebuild')"))
+                logger.info("Indeks FTS5 caption dibangun dari tabel images")
+            session.commit()
+            self._ready = True
+
+    def search(self, session, user_id, terms, limit, offset):
+        self.ensure(session)
+        query = ' '.join(f'"{term}"' for term in terms) + '*'
+        rows = session.execute(text(
+            "SELECT images.id AS id, bm25(images_fts) AS score FROM images_fts "
+            "JOIN images ON images.id = images_fts.rowid "
+            "WHERE images_fts MATCH :query AND images.user_id = :user_id "
+            "ORDER BY score, images.id DESC LIMIT :limit OFFSET :offset"
+        ), {'query': query, 'user_id': user_id, 'limit': limit, 'offset': offset})
+        # bm25() FTS5 bernilai negatif (makin kecil makin relevan)
+        return [(row.id, -float(row.score)) for row in rows]
+
+
+class InMemorySearch:
+    """Indeks terbalik di memori per pengguna dengan peringkat BM25.
+
+    Dibangun dari database pada pencarian pertama dan diperbarui lewat event mapper
+    SQLAlchemy saat baris Images disisipkan, diubah atau dihapus melalui ORM. Setiap
+    proses memiliki indeksnya sendiri, jadi backend ini ditujukan untuk pengembangan
+    lokal dengan satu worker.
+    """
+
+    name = 'memory'
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, model):
+        self.model = model
+        # user_id -> {'postings': {kata: {image_id: tf}}, 'lengths': {image_id: jumlah kata}}
+        self._users = {}
+        self._docs = {}
+        self._ready = False
+        self._lock = threading.RLock()
+        event.listen(model, 'after_insert', self._on_change)
+        event.listen(model, 'after_update', self._on_change)
+        event.listen(model, 'after_delete', self._on_delete)
+
+    def _on_change(self, mapper, connection, target):
+        if self._ready:
+            self.add(target.id, target.user_id, target.predicted_caption)
+
+    def _on_delete(self, mapper, connection, target):
+        if self._ready:
+            self.remove(target.id)
+
+    def add(self, image_id, user_id, caption):
+        with self._lock:
+            self.remove(image_id)
+            terms = tokenize(caption)
+            if not terms:
+                return
+            index = self._users.setdefault(user_id, {'postings': {}, 'lengths': {}})
+            for term in terms:
+                postings = index['postings'].setdefault(term, {})
+                postings[image_id] = postings.get(image_id, 0) + 1
+            index['lengths'][image_id] = len(terms)
+            self._docs[image_id] = (user_id, set(terms))
+
+    def remove(self, image_id):
+        with self._lock:
+            doc = self._docs.pop(image_id, None)
+            if doc is None:
+                return
+            user_id, terms = doc
+            index = self._users[user_id]
+            for term in terms:
+                postings = index['postings'][term]
+                postings.pop(image_id, None)
+                if not postings:
+                    del index['postings'][term]
+            index['lengths'].pop(image_id, None)
+            if not index['lengths']:
+                del self._users[user_id]
+
+    def ensure(self, session):
+        with self._lock:
+            if self._ready:
+                return
+            model = self.model
+            for image_id, user_id, caption in session.query(model.id, model.user_id, model.predicted_caption):
+                self.add(image_id, user_id, caption)
+            self._ready = True
+            logger.info(f"Indeks caption di memori dibangun ({len(self._docs)} gambar)")
+
+    def _matches(self, postings, term, prefix):
+        if not prefix:
+            return postings.get(term, {})
+        # Kata terakhir dicocokkan sebagai prefiks; tf dijumlahkan lintas kata yang cocok
+        merged = {}
+        for candidate, docs in postings.items():
+            if candidate.startswith(term):
+                for image_id, tf in docs.items():
+                    merged[image_id] = merged.get(image_id, 0) + tf
+        return merged
+
+    def search(self, session, user_id, terms, limit, offset):
+        self.ensure(session)
+        with self._lock:
+            index = self._users.get(user_id)
+            if not index or not index['lengths']:
+                return []
+            total = len(index['lengths'])
+            average_length = sum(index['lengths'].values()) / total
+            matches = [self._matches(index['postings'], term, i == len(terms) - 1) for i, term in enumerate(terms)]
+            candidates = set.intersection(*(set(docs) for docs in matches)) if matches else set()
+            scores = {}
+            for image_id in candidates:
+                length = index['lengths'][image_id]
+                score = 0.0
+                for docs in matches:
+                    idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+                    tf = docs[image_id]
+                    score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / average_length))
+                scores[image_id] = score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[offset:offset + limit]
+
+
+def _sqlite_has_fts5(engine):
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)"))
+            connection.execute(text("DROP TABLE temp.fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend(config, engine):
+    """Memilih backend dari SEARCH_BACKEND; 'auto' mengikuti dialect database aktif."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = config['SEARCH_BACKEND']
+            if name not in SEARCH_BACKENDS:
+                raise ValueError(f"Backend pencarian tidak dikenal: {name}")
+            if name == 'auto':
+                dialect = engine.dialect.name
+                if dialect == 'mysql':
+                    name = 'mysql'
+                elif dialect == 'sqlite' and _sqlite_has_fts5(engine):
+                    name = 'sqlite_fts'
+                else:
+                    name = 'memory'
+            if name == 'mysql':
+                _backend = MySQLFullTextSearch()
+            elif name == 'sqlite_fts':
+                _backend = SQLiteFTSSearch()
+            else:
+                from models import Images
+
+                _backend = InMemorySearch(Images)
+            logger.info(f"Backend pencarian caption: {_backend.name}")
+        return _backend
@@ -32,7 +32,8 @@ CREATE TABLE `images` (
   `user_id` int(11) NOT NULL,
   `image_path` varchar(255) NOT NULL,
   `predicted_caption` text NOT NULL,
-  `upload_date` timestamp NOT NULL
+  `upload_date` timestamp NOT NULL,
+  `status` varchar(20) NOT NULL DEFAULT 'done'
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
 -- --------------------------------------------------------
@@ -55,7 +56,9 @@ CREATE TABLE `users` (
 -- Indexes for table `images`
 --
 ALTER TABLE `images`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `ix_images_user_date_id` (`user_id`,`upload_date`,`id`),
+  ADD FULLTEXT KEY `ix_images_caption_fulltext` (`predicted_caption`);
 
 --
 -- Indexes for table `users`
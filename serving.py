@@ -0,0 +1,162 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import tensorflow as tf
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKENDS = ('eager', 'graph', 'tflite')
+TFLITE_QUANTIZATIONS = ('none', 'float16', 'dynamic')
+
+
+class EagerBackend:
+    """Backend inferensi dasar: memanggil model Keras langsung dalam mode eager.
+
+    Semua backend menyediakan operasi yang sama untuk beam search: extract_features,
+    encode, init_cache dan decode_step.
+    """
+
+    name = 'eager'
+
+    def __init__(self, feature_extractor, transformer):
+        self.feature_extractor = feature_extractor
+        self.transformer = transformer
+
+    def extract_features(self, image_tensors):
+        # (batch, H, W, 3) -> grid fitur ResNet50V2 (batch, H/32 * W/32, 2048)
+        features = self.feature_extractor(image_tensors, training=False)
+        return tf.reshape(features, (tf.shape(features)[0], -1, features.shape[3]))
+
+    def encode(self, img_features):
+        return self.transformer.encode(img_features)
+
+    def init_cache(self, enc_output):
+        return self.transformer.init_cache(enc_output)
+
+    def decode_step(self, tar, position, cache):
+        return self.transformer.decode_step(tar, position, cache)
+
+
+class GraphBackend(EagerBackend):
+    """Backend tf.function dengan signature tetap: setiap fungsi di-trace sekali saja.
+
+    Dimensi batch dan panjang cache dibiarkan None, sehingga batch beam search dan
+    cache key/value yang bertambah panjang tetap memakai graph yang sama.
+    """
+
+    name = 'graph'
+
+    def __init__(self, feature_extractor, transformer):
+        super().__init__(feature_extractor, transformer)
+        layer = transformer.decoder.dec_layers[0].mha1
+        kv_spec = tf.TensorSpec([None, layer.num_heads, None, layer.depth], tf.float32)
+        cache_spec = [{'k': kv_spec, 'v': kv_spec, 'enc_k': kv_spec, 'enc_v': kv_spec}
+                      for _ in transformer.decoder.dec_layers]
+        enc_spec = tf.TensorSpec([None, None, transformer.encoder.d_model], tf.float32)
+
+        if feature_extractor is not None:
+            self._extract_features = tf.function(
+                super().extract_features,
+                input_signature=[tf.TensorSpec([None, None, None, 3], tf.float32)])
+        self._encode = tf.function(
+            super().encode, input_signature=[tf.TensorSpec([None, None, 2048], tf.float32)])
+        self._init_cache = tf.function(super().init_cache, input_signature=[enc_spec])
+        self._decode_step = tf.function(
+            super().decode_step,
+            input_signature=[tf.TensorSpec([None, 1], tf.int32), tf.TensorSpec([], tf.int32), cache_spec])
+
+    def extract_features(self, image_tensors):
+        return self._extract_features(tf.convert_to_tensor(image_tensors, dtype=tf.float32))
+
+    def encode(self, img_features):
+        return self._encode(img_features)
+
+    def init_cache(self, enc_output):
+        return self._init_cache(enc_output)
+
+    def decode_step(self, tar, position, cache):
+        return self._decode_step(tf.cast(tar, tf.int32), position, cache)
+
+
+class TFLiteBackend(GraphBackend):
+    """Feature extractor ResNet50V2 dijalankan dengan interpreter TFLite (XNNPACK).
+
+    Bobot dapat dikuantisasi ke float16 atau int8 dynamic-range. Decoder tetap
+    memakai tf.function karena cache key/value-nya berubah ukuran di setiap langkah.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_path, transformer, num_threads=None):
+        super().__init__(None, transformer)
+        self.model_path = model_path
+        self._interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads or os.cpu_count())
+        self._input_index = self._interpreter.get_input_details()[0]['index']
+        self._output_index = self._interpreter.get_output_details()[0]['index']
+        self._input_shape = None
+        # Interpreter TFLite tidak thread-safe
+        self._lock = threading.Lock()
+
+    def extract_features(self, image_tensors):
+        images = tf.convert_to_tensor(image_tensors, dtype=tf.float32).numpy()
+        with self._lock:
+            if images.shape != self._input_shape:
+                self._interpreter.resize_tensor_input(self._input_index, list(images.shape))
+                self._interpreter.allocate_tensors()
+                self._input_shape = images.shape
+            self._interpreter.set_tensor(self._input_index, images)
+            self._interpreter.invoke()
+            features = self._interpreter.get_tensor(self._output_index)
+        return tf.reshape(features, (features.shape[0], -1, features.shape[3]))
+
+
+def tflite_model_path(directory, quantization):
+    return os.path.join(directory, f'resnet50v2_{quantization}.tflite')
+
+
+def convert_to_tflite(feature_extractor, path, quantization='float16'):
+    """Mengonversi feature extractor Keras ke file .tflite (ditulis secara atomik)."""
+    if quantization not in TFLITE_QUANTIZATIONS:
+        raise ValueError(f"Kuantisasi TFLite tidak dikenal: {quantization}")
+    start = time.perf_counter()
+
+    # Keras 3 perlu diekspor ke SavedModel dulu; konversi dari concrete function gagal
+    export_dir = tempfile.mkdtemp()
+    try:
+        feature_extractor.export(export_dir)
+        converter = tf.lite.TFLiteConverter.from_saved_model(export_dir)
+        if quantization != 'none':
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        model = converter.convert()
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(model)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Model TFLite ({quantization}, {len(model) / 1e6:.1f} MB) dibuat dalam "
+                f"{time.perf_counter() - start:.1f} detik: {path}")
+    return path
+
+
+def create_backend(name, feature_extractor, transformer, tflite_path=None, tflite_quantization='float16',
+                   tflite_threads=None):
+    if name == 'eager':
+        return EagerBackend(feature_extractor, transformer)
+    if name == 'graph':
+        return GraphBackend(feature_extractor, transformer)
+    if name == 'tflite':
+        if not os.path.exists(tflite_path):
+            convert_to_tflite(feature_extractor, tflite_path, tflite_quantization)
+        return TFLiteBackend(tflite_path, transformer, tflite_threads)
+    raise ValueError(f"Backend inferensi tidak dikenal: {name}")
@@ -0,0 +1,322 @@
+import fcntl
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from flask import current_app
+
+from admission import get_admission_controller
+from feature_cache import feature_key, get_feature_cache
+from metrics import timed
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 2048
+VECTOR_DTYPE = np.dtype(np.float16)
+ID_DTYPE = np.dtype(np.int64)
+# id gambar yang sudah dihapus; barisnya dibuang saat pemadatan
+TOMBSTONE = -1
+
+
+def pool_embedding(features):
+    """Grid fitur ResNet50V2 (posisi, 2048) -> embedding 2048 ternormalisasi L2 dalam float16."""
+    features = np.asarray(features, dtype=np.float32)
+    vector = features.reshape(-1, features.shape[-1]).mean(axis=0)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).astype(VECTOR_DTYPE)
+
+
+def image_features(image, background=False):
+    """Grid fitur satu IngestedImage dari cache fitur, atau diekstrak di dalam slot inferensi."""
+    from inference import extract_features
+
+    config = current_app.config
+    feature_cache = get_feature_cache(config)
+    features = feature_cache.get(feature_key(image)) if feature_cache else None
+    if features is None:
+        tensor = image.model_tensor()
+        with get_admission_controller(config).slot(background):
+            features = extract_features(tensor).numpy()[0]
+        if feature_cache:
+            feature_cache.put(feature_key(image), features)
+    return features
+
+
+def _kmeans(vectors, k, iterations=10, seed=0):
+    # k-means sferis sederhana (embedding sudah ternormalisasi, jadi dot product = cosine)
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(k):
+            members = vectors[assignments == cluster]
+            if len(members):
+                centroid = members.mean(axis=0)
+                centroids[cluster] = centroid / (np.linalg.norm(centroid) or 1.0)
+    return centroids
+
+
+class UserVectorIndex:
+    """Embedding gambar milik satu pengguna, disimpan sebagai file append-only yang di-memory-map.
+
+    <user>.vec berisi baris float16 dan <user>.ids berisi id gambar int64 pada urutan
+    yang sama, sehingga indeks langsung siap dipakai setelah startup tanpa membaca
+    seluruh file. Pencarian brute-force dengan NumPy; setelah jumlah baris mencapai
+    ivf_min_size, baris dipartisi dengan k-means (IVF) dan hanya ivf_probes partisi
+    terdekat yang diperiksa. Penulisan dari beberapa worker diserialisasi dengan flock.
+    """
+
+    def __init__(self, directory, user_id, ivf_min_size=2000, ivf_probes=8, dim=EMBEDDING_DIM):
+        base = os.path.join(directory, str(user_id))
+        self.vec_path = f'{base}.vec'
+        self.ids_path = f'{base}.ids'
+        self.centroids_path = f'{base}.centroids.npy'
+        self.lists_path = f'{base}.lists'
+        self.lock_path = f'{base}.lock'
+        self.dim = dim
+        self.ivf_min_size = ivf_min_size
+        self.ivf_probes = ivf_probes
+        self._lock = threading.RLock()
+        self._signature = None
+        self._vectors = np.empty((0, dim), VECTOR_DTYPE)
+        self._ids = np.empty((0,), ID_DTYPE)
+        self._centroids = None
+        self._order = None
+        self._bounds = None
+        self._listed = 0
+        self._building = False
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stat(self, path):
+        try:
+            stat = os.stat(path)
+            return stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            return None, 0
+
+    def _refresh(self):
+        # Map ulang bila file berubah (ditambah atau dipadatkan, juga oleh worker lain)
+        signature = tuple(self._stat(path) for path in (self.vec_path, self.ids_path, self.lists_path,
+                                                         self.centroids_path))
+        if signature == self._signature:
+            return
+        rows = min(signature[0][1] // (self.dim * VECTOR_DTYPE.itemsize), signature[1][1] // ID_DTYPE.itemsize)
+        if rows:
+            self._vectors = np.memmap(self.vec_path, VECTOR_DTYPE, 'r', shape=(rows, self.dim))
+            self._ids = np.memmap(self.ids_path, ID_DTYPE, 'r', shape=(rows,))
+        else:
+            self._vectors = np.empty((0, self.dim), VECTOR_DTYPE)
+            self._ids = np.empty((0,), ID_DTYPE)
+
+        self._centroids = self._order = self._bounds = None
+        self._listed = 0
+        if signature[3][0] is not None and signature[2][1]:
+            self._centroids = np.load(self.centroids_path)
+            lists = np.fromfile(self.lists_path, np.int32)[:rows]
+            # Daftar terbalik: baris diurutkan per partisi, bounds menandai awal tiap partisi
+            self._order = np.argsort(lists, kind='stable')
+            self._bounds = np.searchsorted(lists[self._order], np.arange(len(self._centroids) + 1))
+            self._listed = len(lists)
+        self._signature = signature
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return int(np.count_nonzero(np.asarray(self._ids) != TOMBSTONE))
+
+    def add(self, image_id, embedding):
+        embedding = np.asarray(embedding, dtype=VECTOR_DTYPE).reshape(self.dim)
+        with self._lock, self._file_lock():
+            self._refresh()
+            with open(self.vec_path, 'ab') as f:
+                f.write(embedding.tobytes())
+            with open(self.ids_path, 'ab') as f:
+                f.write(np.array([image_id], ID_DTYPE).tobytes())
+            self._refresh()
+            if self._centroids is not None and self._listed < len(self._ids):
+                # Baris baru (termasuk yang ditambahkan selama IVF dibangun) langsung
+                # masuk partisi terdekat agar tetap terjangkau pencarian IVF
+                clusters = np.argmax(self._scores(np.arange(self._listed, len(self._ids)), self._centroids.T), axis=1)
+                with open(self.lists_path, 'ab') as f:
+                    f.write(clusters.astype(np.int32).tobytes())
+                self._refresh()
+            rows = len(self._ids)
+        # Partisi dibangun ulang setiap kali indeks tumbuh dua kali lipat (k = akar jumlah baris saat build)
+        if rows >= self.ivf_min_size and (self._centroids is None or rows >= 2 * len(self._centroids) ** 2):
+            self._build_ivf_in_background()
+
+    def remove(self, image_id):
+        with self._lock, self._file_lock():
+            self._refresh()
+            positions = np.flatnonzero(np.asarray(self._ids) == image_id)
+            if not len(positions):
+                return False
+            with open(self.ids_path, 'r+b') as f:
+                for position in positions:
+                    f.seek(int(position) * ID_DTYPE.itemsize)
+                    f.write(np.array([TOMBSTONE], ID_DTYPE).tobytes())
+            self._signature = None
+            self._refresh()
+            tombstones = int(np.count_nonzero(np.asarray(self._ids) == TOMBSTONE))
+            if tombstones > 64 and tombstones * 4 > len(self._ids):
+                self._compact()
+        return True
+
+    def _compact(self):
+        # Dipanggil dengan kedua lock dipegang: tulis ulang file tanpa baris yang dihapus
+        keep = np.asarray(self._ids) != TOMBSTONE
+        for path, data in ((self.vec_path, np.asarray(self._vectors)[keep]), (self.ids_path, np.asarray(self._ids)[keep])):
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            data.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        # Partisi IVF lama tidak lagi sejajar dengan baris; dibangun ulang saat indeks cukup besar
+        for path in (self.lists_path, self.centroids_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._signature = None
+        self._refresh()
+        if len(self._ids) >= self.ivf_min_size:
+            self._build_ivf_in_background()
+
+    def _build_ivf_in_background(self):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self.build_ivf, name='similarity-ivf', daemon=True).start()
+
+    def build_ivf(self, sample_size=10000):
+        try:
+            with self._lock:
+                self._refresh()
+                rows = len(self._ids)
+                vectors = self._vectors
+            if not rows:
+                return
+            k = max(1, int(np.sqrt(rows)))
+            rng = np.random.default_rng(0)
+            sample = np.asarray(vectors[np.sort(rng.choice(rows, min(rows, sample_size), replace=False))], np.float32)
+            centroids = _kmeans(sample, min(k, len(sample)))
+            lists = np.concatenate([np.argmax(np.asarray(vectors[start:start + 4096], np.float32) @ centroids.T, axis=1)
+                                    for start in range(0, rows, 4096)]).astype(np.int32)
+            with self._lock, self._file_lock():
+                self._refresh()
+                # Baris yang ditambahkan selama pembangunan dicari secara brute-force sampai build berikutnya
+                if len(self._ids) < rows:
+                    return
+                tmp_path = f'{self.centroids_path}.{os.getpid()}.tmp.npy'
+                np.save(tmp_path, centroids)
+                os.replace(tmp_path, self.centroids_path)
+                tmp_path = f'{self.lists_path}.{os.getpid()}.tmp'
+                lists.tofile(tmp_path)
+                os.replace(tmp_path, self.lists_path)
+                self._signature = None
+                self._refresh()
+            logger.info(f"Indeks IVF dibangun: {rows} baris, {len(centroids)} partisi")
+        except Exception as e:
+            logger.error(f"Kesalahan saat membangun indeks IVF: {str(e)}")
+        finally:
+            self._building = False
+
+    def _scores(self, rows, matrix, chunk=4096):
+        # Konversi float16 -> float32 per potongan agar tetap di cache CPU
+        return np.concatenate([np.asarray(self._vectors[rows[start:start + chunk]], np.float32) @ matrix
+                               for start in range(0, len(rows), chunk)])
+
+    def embedding(self, image_id):
+        with self._lock:
+            self._refresh()
+            positions = np.flatnonzero(np.asarray(self._ids) == image_id)
+            return np.array(self._vectors[positions[-1]]) if len(positions) else None
+
+    def search(self, embedding, k=10, exclude=None):
+        """Mengembalikan daftar (image_id, cosine) terurut dari yang paling mirip."""
+        query = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            self._refresh()
+            ids = np.asarray(self._ids)
+            if self._centroids is not None:
+                probes = np.argsort(-(self._centroids @ query))[:self.ivf_probes]
+                candidates = [self._order[self._bounds[cluster]:self._bounds[cluster + 1]] for cluster in probes]
+                # Baris setelah partisi terakhir dibangun belum punya partisi
+                candidates.append(np.arange(self._listed, len(ids)))
+                rows = np.sort(np.concatenate(candidates))
+            else:
+                rows = np.arange(len(ids))
+            if not len(rows):
+                return []
+            with timed('similarity_search'):
+                scores = self._scores(rows, query)
+        valid = ids[rows] != TOMBSTONE
+        if exclude is not None:
+            valid &= ids[rows] != exclude
+        rows, scores = rows[valid], scores[valid]
+        top = np.argsort(-scores)[:k]
+        return [(int(ids[rows[i]]), float(scores[i])) for i in top]
+
+
+class SimilarityIndex:
+    """Kumpulan UserVectorIndex per pengguna di bawah satu direktori."""
+
+    def __init__(self, directory, ivf_min_size=2000, ivf_probes=8):
+        self.directory = directory
+        self.ivf_min_size = ivf_min_size
+        self.ivf_probes = ivf_probes
+        os.makedirs(directory, exist_ok=True)
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def user(self, user_id):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                index = self._users[user_id] = UserVectorIndex(self.directory, user_id, self.ivf_min_size,
+                                                               self.ivf_probes)
+            return index
+
+    def add(self, user_id, image_id, embedding):
+        self.user(user_id).add(image_id, embedding)
+
+    def remove(self, user_id, image_id):
+        return self.user(user_id).remove(image_id)
+
+    def similar(self, user_id, image_id, k=10):
+        index = self.user(user_id)
+        embedding = index.embedding(image_id)
+        if embedding is None:
+            return None
+        return index.search(embedding, k, exclude=image_id)
+
+    def near_duplicate(self, user_id, embedding, threshold):
+        # Gambar pengguna yang sama dengan cosine >= threshold, atau None
+        matches = self.user(user_id).search(embedding, 1)
+        if matches and matches[0][1] >= threshold:
+            return matches[0]
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index(config):
+    """Mengembalikan indeks kemiripan, atau None bila SIMILARITY_INDEX_DIR kosong."""
+    global _index
+    if not config['SIMILARITY_INDEX_DIR']:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex(config['SIMILARITY_INDEX_DIR'], config['SIMILARITY_IVF_MIN_SIZE'],
+                                     config['SIMILARITY_IVF_PROBES'])
+        return _index
@@ -281,7 +281,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function captureImage() {
         disableButtons(true);
-        captureButton.innerHTML = 'Memproses... <svg class="animate-spin h-5 w-5 text-white inline-block" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zM2 12a10 10 0 0110-10v2A8 8 0 004 12H2zm20 0a8 8 0 01-8 8v2c6.627 0 12-5.373 12-12h-4zm-2 0a10 10 0 01-10 10v-2a8 8 0 008-8h2z"></path></svg>';
+        captureButton.innerHTML = '<span class="job-progress">Memproses...</span> <svg class="animate-spin h-5 w-5 text-white inline-block" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zM2 12a10 10 0 0110-10v2A8 8 0 004 12H2zm20 0a8 8 0 01-8 8v2c6.627 0 12-5.373 12-12h-4zm-2 0a10 10 0 01-10 10v-2a8 8 0 008-8h2z"></path></svg>';
 
         const canvas = document.createElement('canvas');
         canvas.width = video.videoWidth;
@@ -339,7 +339,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         disableButtons(true);
-        uploadButton.innerHTML = 'Memproses... <svg class="animate-spin h-5 w-5 text-white inline-block" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zM2 12a10 10 0 0110-10v2A8 8 0 004 12H2zm20 0a8 8 0 01-8 8v2c6.627 0 12-5.373 12-12h-4zm-2 0a10 10 0 01-10 10v-2a8 8 0 008-8h2z"></path></svg>';
+        uploadButton.innerHTML = '<span class="job-progress">Memproses...</span> <svg class="animate-spin h-5 w-5 text-white inline-block" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zM2 12a10 10 0 0110-10v2A8 8 0 004 12H2zm20 0a8 8 0 01-8 8v2c6.627 0 12-5.373 12-12h-4zm-2 0a10 10 0 01-10 10v-2a8 8 0 008-8h2z"></path></svg>';
 
         const reader = new FileReader();
         reader.onloadend = async () => {
@@ -364,7 +364,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const formData = new FormData();
         formData.append('file', dataURItoBlob(imageData), 'image.jpg');
 
-        const response = await fetch('/images', {
+        const response = await fetch('/images?async=true', {
             method: 'POST',
             body: formData
         });
@@ -374,7 +374,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         const data = await response.json();
-        const captionText = data.caption;
+        const captionText = data.job_id !== undefined ? await waitForCaption(data.job_id) : data.caption;
         
         cameraContainer.classList.add('hidden');
         uploadContainer.classList.add('hidden');
@@ -383,6 +383,72 @@ document.addEventListener('DOMContentLoaded', () => {
         return captionText;
     }
 
+    const jobStatusLabels = {
+        pending: 'Menunggu antrean...',
+        processing: 'Memproses...'
+    };
+
+    function showJobProgress(status) {
+        const label = jobStatusLabels[status];
+        if (label) {
+            document.querySelectorAll('.job-progress').forEach(element => {
+                element.textContent = label;
+            });
+        }
+    }
+
+    function waitForCaption(jobId) {
+        return new Promise((resolve, reject) => {
+            const handleJob = (job) => {
+                showJobProgress(job.status);
+                if (job.status === 'done') {
+                    resolve(job.caption);
+                    return true;
+                }
+                if (job.status === 'failed') {
+                    reject(new Error('Captioning failed'));
+                    return true;
+                }
+                return false;
+            };
+
+            if (!('EventSource' in window)) {
+                pollJobStatus(jobId, handleJob, reject);
+                return;
+            }
+
+            const source = new EventSource(`/images/${jobId}/events`);
+            source.addEventListener('status', (event) => {
+                if (handleJob(JSON.parse(event.data))) {
+                    source.close();
+                }
+            });
+            source.addEventListener('deleted', () => {
+                source.close();
+                reject(new Error('Image deleted'));
+            });
+            source.onerror = () => {
+                // Koneksi SSE terputus sebelum job selesai, lanjutkan dengan polling
+                source.close();
+                pollJobStatus(jobId, handleJob, reject);
+            };
+        });
+    }
+
+    async function pollJobStatus(jobId, handleJob, reject) {
+        try {
+            const response = await fetch(`/images/${jobId}/status`);
+            if (!response.ok) {
+                throw new Error('Failed to get job status');
+            }
+            if (!handleJob(await response.json())) {
+                setTimeout(() => pollJobStatus(jobId, handleJob, reject), 1000);
+            }
+        } catch (error) {
+            reject(error);
+        }
+    }
+
     function dataURItoBlob(dataURI) {
         const byteString = atob(dataURI.split(',')[1]);
         const mimeString = dataURI.split(',')[0].split(':')[1].split(';')[0];
@@ -453,31 +519,81 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    const HISTORY_PAGE_SIZE = 20;
+    const HISTORY_CAPTION_LENGTH = 120;
+    let historyCursor = null;
+    let historyQuery = '';
+    let historySearchTimer = null;
+
+    // Pencarian caption di server (GET /images/search), ditunda sampai pengguna berhenti mengetik
+    document.getElementById('history-search').addEventListener('input', (event) => {
+        clearTimeout(historySearchTimer);
+        historySearchTimer = setTimeout(() => {
+            historyQuery = event.target.value.trim();
+            populateHistoryTable();
+        }, 300);
+    });
+
     async function populateHistoryTable() {
         historyTableBody.innerHTML = '';
+        historyData = [];
+        historyCursor = null;
+        await loadHistoryPage();
+    }
+
+    async function loadHistoryPage() {
+        const loadMoreRow = document.getElementById('history-load-more');
+        if (loadMoreRow) {
+            loadMoreRow.remove();
+        }
         try {
-            const response = await fetch('/images', {
+            const params = new URLSearchParams({
+                limit: HISTORY_PAGE_SIZE,
+                truncate: HISTORY_CAPTION_LENGTH,
+                fields: 'id,image_path,thumbnail_path,upload_date,predicted_caption,status'
+            });
+            if (historyCursor) {
+                params.set('cursor', historyCursor);
+            }
+            if (historyQuery) {
+                params.set('q', historyQuery);
+            }
+            const url = historyQuery ? `/images/search?${params}` : `/images?${params}`;
+            const response = await fetch(url, {
                 method: 'GET'
             });
-            const images = await response.json();
-            images.forEach((item, index) => {
+            const page = await response.json();
+            page.items.forEach((item) => {
+                const index = historyData.length;
+                historyData.push(item);
                 const row = document.createElement('tr');
                 const formattedDate = formatTanggalIndonesia(item.upload_date);
                 row.innerHTML = `
-                    <td class="border px-4 py-2"><img src="${item.image_path}" class="w-16 h-16 object-cover cursor-pointer" onclick="showHistoryModal(${index})"></td>
+                    <td class="border px-4 py-2"><img src="${item.thumbnail_path}" loading="lazy" class="w-16 h-16 object-cover cursor-pointer" onclick="showHistoryModal(${index})"></td>
                     <td class="border px-4 py-2">${item.predicted_caption}</td>
                     <td class="border px-4 py-2">${formattedDate}</td>
                 `;
                 historyTableBody.appendChild(row);
             });
-            historyData = images;
+            historyCursor = page.next_cursor;
+            if (historyCursor) {
+                const row = document.createElement('tr');
+                row.id = 'history-load-more';
+                row.innerHTML = `
+                    <td colspan="3" class="border px-4 py-2 text-center">
+                        <button class="bg-blue-500 text-white px-4 py-2 rounded shadow">Muat Lebih Banyak</button>
+                    </td>
+                `;
+                row.querySelector('button').addEventListener('click', loadHistoryPage);
+                historyTableBody.appendChild(row);
+            }
         } catch (error) {
             console.error('Error fetching history:', error);
             showToastError('Terjadi kesalahan saat mengambil riwayat gambar.');
         }
     }
 
-    window.showHistoryModal = function (index) {
+    window.showHistoryModal = async function (index) {
         const item = historyData[index];
         modalImage.src = item.image_path;
         modalCaption.textContent = item.predicted_caption;
@@ -488,6 +604,23 @@ document.addEventListener('DOMContentLoaded', () => {
         if (window.innerWidth <= 768) { 
             historyModal.style.paddingTop = '20%';
         }
+
+        // Tabel hanya memuat caption terpotong; ambil caption lengkap untuk modal
+        if (item.caption_truncated) {
+            try {
+                const response = await fetch(`/images/${item.id}`);
+                if (response.ok) {
+                    const detail = await response.json();
+                    item.predicted_caption = detail.predicted_caption;
+                    item.caption_truncated = false;
+                    if (currentModalIndex === index) {
+                        modalCaption.textContent = item.predicted_caption;
+                    }
+                }
+            } catch (error) {
+                console.error('Error fetching caption:', error);
+            }
+        }
     };
 
     modalReplayCaption.addEventListener('click', () => {
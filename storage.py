@@ -0,0 +1,202 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
+from PIL import Image as PILImage
+
+from metrics import timed
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Nama file tersimpan: <sha256>.webp, turunan thumbnail <sha256>_<sisi>.webp
+CONTENT_NAME = re.compile(r'^(?P<hash>[0-9a-f]{64})(?:_(?P<size>\d+))?\.webp$')
+# Nama file lama sebelum penyimpanan berbasis isi: <uuid4>.webp dan thumbnail <uuid4>_<sisi>.webp
+LEGACY_NAME = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(?:_\d+)?\.webp$')
+
+
+def thumbnail_path(image_path, size):
+    # Juga berlaku untuk file lama bernama UUID; thumbnail-nya dibuat saat pertama diminta
+    base, _ = os.path.splitext(image_path)
+    return f'{base}_{size}.webp'
+
+
+def is_thumbnail(path, sizes):
+    """True untuk turunan <nama>_<sisi>.webp (sisi dari sizes) yang berdampingan dengan <nama>.webp."""
+    stem, extension = os.path.splitext(path)
+    base, _, size = stem.rpartition('_')
+    return extension.lower() == '.webp' and size.isdigit() and int(size) in sizes and os.path.exists(f'{base}.webp')
+
+
+def stored_digest(path):
+    # Hash SHA-256 byte asli unggahan dari nama file WebP utama; None untuk file lain
+    match = CONTENT_NAME.match(os.path.basename(path))
+    return match.group('hash') if match and not match.group('size') else None
+
+
+class UploadStore:
+    """Penyimpanan unggahan yang dialamatkan oleh isi (hash SHA-256 byte asli).
+
+    Unggahan identik berbagi satu file WebP dan thumbnail yang sama. Encode WebP
+    berjalan di pool thread latar belakang sehingga request tidak menunggu encoder;
+    selama itu byte asli disimpan sementara sebagai <hash>.src dan dihapus setelah
+    semua turunan selesai, sehingga encode yang terputus dapat diulang saat file
+    diminta. File dihapus hanya bila tidak ada lagi baris yang merujuknya dan tidak
+    ada unggahan yang sedang diproses (antara save dan finish) memakai isi yang sama.
+    """
+
+    def __init__(self, root='static/uploads', webp_quality=65, webp_method=4, thumbnail_sizes=(128,),
+                 workers=2):
+        self.root = root
+        self.webp_quality = webp_quality
+        self.webp_method = webp_method
+        self.thumbnail_sizes = tuple(sorted(thumbnail_sizes))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webp-encode')
+        self._pending = {}
+        # digest -> jumlah unggahan yang sudah save tetapi barisnya belum tersimpan
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, digest, size=None):
+        name = f'{digest}.webp' if size is None else f'{digest}_{size}.webp'
+        return os.path.join(self.root, digest[:2], name)
+
+    def _source_path(self, digest):
+        return os.path.join(self.root, digest[:2], f'{digest}.src')
+
+    def save(self, image):
+        """Mengembalikan path WebP untuk IngestedImage; encode dijadwalkan bila file belum ada.
+
+        Setiap save harus diikuti finish(path) setelah baris yang merujuk file disimpan
+        (atau unggahan gagal); sampai saat itu delete tidak menghapus file ini.
+        """
+        digest = image.hash
+        path = self.path_for(digest)
+        with self._lock:
+            self._inflight[digest] = self._inflight.get(digest, 0) + 1
+            if digest in self._pending or os.path.exists(path):
+                return path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write_atomic(self._source_path(digest), lambda f: f.write(image.data))
+            self._pending[digest] = self._executor.submit(self._encode, digest, image.image)
+        return path
+
+    def finish(self, image_path):
+        match = CONTENT_NAME.match(os.path.basename(image_path))
+        if not match:
+            return
+        digest = match.group('hash')
+        with self._lock:
+            count = self._inflight.get(digest, 0) - 1
+            if count > 0:
+                self._inflight[digest] = count
+            else:
+                self._inflight.pop(digest, None)
+
+    def _write_atomic(self, path, write):
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def _save_webp(self, image, path):
+        self._write_atomic(path, lambda f: image.save(f, format='webp', quality=self.webp_quality,
+                                                      method=self.webp_method))
+
+    def _encode(self, digest, image):
+        try:
+            with timed('webp'):
+                self._save_webp(image, self.path_for(digest))
+                for size in self.thumbnail_sizes:
+                    thumbnail = image.copy()
+                    thumbnail.thumbnail((size, size), PILImage.BICUBIC, reducing_gap=2.0)
+                    self._save_webp(thumbnail, self.path_for(digest, size))
+            # Bisa sudah dihapus oleh encode ulang yang berjalan bersamaan (lihat ensure)
+            with suppress(FileNotFoundError):
+                os.remove(self._source_path(digest))
+        except Exception as e:
+            logger.error(f"Kesalahan saat encode WebP {digest}: {str(e)}")
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(digest, None)
+
+    def wait(self, digest, timeout=None):
+        with self._lock:
+            future = self._pending.get(digest)
+        if future is not None:
+            future.result(timeout)
+
+    def ensure(self, path, timeout=30):
+        """Memastikan file di bawah root tersedia sebelum dikirim; False bila tidak dapat dibuat."""
+        if os.path.exists(path):
+            return True
+        match = CONTENT_NAME.match(os.path.basename(path))
+        if match:
+            digest = match.group('hash')
+            self.wait(digest, timeout)
+            source = self._source_path(digest)
+            if not os.path.exists(self.path_for(digest)) and os.path.exists(source):
+                # Encode sebelumnya terputus (misalnya worker dihentikan): ulangi dari byte asli
+                from ingest import IngestedImage
+
+                with open(source, 'rb') as f:
+                    self._encode(digest, IngestedImage(f.read()).image)
+            if os.path.exists(path):
+                return True
+        size = self._requested_thumbnail(path)
+        base = path.rsplit('_', 1)[0] + '.webp' if size else None
+        if base and os.path.exists(base):
+            with PILImage.open(base) as image:
+                image.thumbnail((size, size), PILImage.BICUBIC, reducing_gap=2.0)
+                self._save_webp(image, path)
+            return True
+        return False
+
+    def _requested_thumbnail(self, path):
+        # Hanya ukuran yang dikonfigurasi yang boleh dibuat sesuai permintaan
+        name = os.path.splitext(os.path.basename(path))[0]
+        _, _, size = name.rpartition('_')
+        if size.isdigit() and int(size) in self.thumbnail_sizes:
+            return int(size)
+        return None
+
+    def delete(self, image_path, is_referenced):
+        """Menghapus WebP beserta turunannya bila is_referenced() bernilai False."""
+        match = CONTENT_NAME.match(os.path.basename(image_path))
+        if match:
+            # Encode yang masih berjalan akan menulis ulang file setelah dihapus
+            self.wait(match.group('hash'))
+        with self._lock:
+            if match and match.group('hash') in self._inflight:
+                return False
+            if is_referenced():
+                return False
+            paths = [image_path] + [thumbnail_path(image_path, size) for size in self.thumbnail_sizes]
+            if match:
+                paths.append(self._source_path(match.group('hash')))
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_upload_store(config):
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = UploadStore(
+                root=config['UPLOAD_FOLDER'],
+                webp_quality=config['UPLOAD_WEBP_QUALITY'],
+                webp_method=config['UPLOAD_WEBP_METHOD'],
+                thumbnail_sizes=config['UPLOAD_THUMBNAIL_SIZES'],
+                workers=config['UPLOAD_ENCODE_WORKERS']
+            )
+        return _store
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Database SQLite di memori; harus diisi sebelum config dan app diimpor
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.setdefault('SIMILARITY_INDEX_DIR', '')
+
+from app import app as flask_app  # noqa: E402
+from extensions import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,33 @@
+import pytest
+
+from extensions import db
+from models import Images, Users
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/register', data={'username': 'tester', 'password': 'rahasia', 'confirm_password': 'rahasia'})
+    client.post('/login', data={'username': 'tester', 'password': 'rahasia'})
+    user = Users.query.filter_by(username='tester').first()
+    db.session.add(Images(user_id=user.id, image_path='static/uploads/a.webp',
+                          predicted_caption='air terjun di tengah hutan', status='done'))
+    db.session.commit()
+    return client
+
+
+def test_truncate_shortens_caption(client):
+    response = client.get('/images?truncate=9&fields=id,predicted_caption')
+
+    assert response.status_code == 200
+    item = response.get_json()[0]
+    assert item['predicted_caption'] == 'air terju...'
+    assert item['caption_truncated'] is True
+
+
+@pytest.mark.parametrize('value', ['0', '-3', 'abc'])
+def test_truncate_must_be_positive(client, value):
+    response = client.get(f'/images?truncate={value}')
+
+    assert response.status_code == 400
+    assert 'truncate' in response.get_json()['error']
@@ -0,0 +1,29 @@
+from models import Images
+from search import InMemorySearch
+
+
+def make_index():
+    index = InMemorySearch(Images)
+    # Tanpa database: indeks dianggap sudah dibangun, isinya diatur langsung oleh test
+    index._ready = True
+    return index
+
+
+def test_search_ranks_matching_captions():
+    index = make_index()
+    index.add(1, 7, 'deskripsi air terjun')
+    index.add(2, 7, 'deskripsi pantai')
+    index.add(3, 8, 'deskripsi air terjun')
+
+    results = index.search(None, 7, ['air'], 10, 0)
+
+    assert [image_id for image_id, _ in results] == [1]
+
+
+def test_search_after_all_images_deleted_returns_empty():
+    index = make_index()
+    index.add(1, 7, 'deskripsi air terjun')
+    index.remove(1)
+
+    assert index.search(None, 7, ['deskripsi'], 10, 0) == []
+    assert 7 not in index._users
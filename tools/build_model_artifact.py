@@ -0,0 +1,63 @@
+"""Membangun artifact model (manifest.json, weights.bin, vocab.npy) dari aset lama.
+
+Bobot Transformer dibaca dari file .h5, kosakata dari pickle Tokenizer, dan bobot
+ResNet50V2 dari ImageNet (diunduh sekali oleh Keras) atau file .h5 lokal lewat
+--resnet-weights. Setelah ditulis, isi artifact dibandingkan dengan bobot model
+sumber. Aplikasi memakai artifact di MODEL_ARTIFACT_DIR bila ada. Jalankan dari
+root repo:
+
+    python tools/build_model_artifact.py
+    python tools/build_model_artifact.py --resnet-weights resnet50v2_notop.h5 --output /srv/seeimg/model
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from model_artifact import ModelArtifact, Vocabulary, write_artifact  # noqa: E402
+from model_registry import HYPERPARAMETERS, ModelRegistry  # noqa: E402
+
+
+def verify(output, networks, vocabulary):
+    artifact = ModelArtifact(output)
+    for network, model in networks.items():
+        for (name, value), variable in zip(artifact.arrays(network), model.weights):
+            if not np.array_equal(value, variable.numpy()):
+                raise SystemExit(f"Tensor {name} di artifact berbeda dari model sumber")
+    if artifact.vocabulary().index_word != vocabulary.index_word:
+        raise SystemExit("Kosakata di artifact berbeda dari tokenizer sumber")
+    return artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='./assets/model.weights.h5', help='bobot Transformer (.h5)')
+    parser.add_argument('--tokenizer', default='./assets/tokenizer.pickle')
+    parser.add_argument('--resnet-weights', default='imagenet', help="'imagenet' atau path .h5 ResNet50V2 tanpa top")
+    parser.add_argument('--output', default=Config.MODEL_ARTIFACT_DIR or 'assets/model_artifact')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # Selalu dari aset lama, walaupun artifact di --output sudah ada
+    source = ModelRegistry(weights_path=args.weights, tokenizer_path=args.tokenizer, backend='eager',
+                           resnet_weights=args.resnet_weights, max_caption_length=Config.MAX_CAPTION_LENGTH)
+    source.ensure_loaded()
+    networks = {'resnet': source.feature_extractor, 'transformer': source.transformer}
+    vocabulary = Vocabulary.from_tokenizer(source.tokenizer)
+
+    manifest = write_artifact(args.output, networks, vocabulary, HYPERPARAMETERS)
+    verify(args.output, networks, vocabulary)
+
+    tensors = sum(len(entries) for entries in manifest['tensors'].values())
+    print(f"Artifact {manifest['model_version']} ditulis ke {args.output}: {tensors} tensor, "
+          f"{manifest['weights_bytes'] / 1e6:.1f} MB bobot, {manifest['vocab_size']} kata "
+          f"({time.perf_counter() - start:.1f} detik)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Mengisi indeks kemiripan visual untuk gambar riwayat yang belum terindeks.
+
+Gambar yang diunggah sebelum indeks kemiripan aktif (atau yang indeksnya dihapus)
+tidak punya embedding. Tool ini membaca WebP tiap baris Images yang belum ada di
+indeks pengguna, mengekstrak grid fitur ResNet dalam batch (memakai cache fitur bila
+aktif), lalu menambahkan embedding-nya. Aman dijalankan ulang. Jalankan dari root repo:
+
+    python tools/build_similarity_index.py
+    python tools/build_similarity_index.py --user-id 1 --batch-size 32
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--user-id', type=int, help='hanya gambar milik pengguna ini')
+    parser.add_argument('--batch-size', type=int, default=16)
+    args = parser.parse_args()
+
+    from app import app
+    from feature_cache import feature_key, get_feature_cache
+    from inference import extract_features
+    from ingest import IngestedImage
+    from models import Images
+    from similarity import get_similarity_index, pool_embedding
+    from storage import get_upload_store, stored_digest
+
+    with app.app_context():
+        index = get_similarity_index(app.config)
+        if index is None:
+            sys.exit("SIMILARITY_INDEX_DIR kosong; indeks kemiripan tidak aktif")
+        store = get_upload_store(app.config)
+        feature_cache = get_feature_cache(app.config)
+        query = Images.query.with_entities(Images.id, Images.user_id, Images.image_path)
+        if args.user_id is not None:
+            query = query.filter(Images.user_id == args.user_id)
+        rows = [row for row in query.order_by(Images.id) if index.user(row.user_id).embedding(row.id) is None]
+
+    print(f"{len(rows)} gambar belum terindeks")
+    start = time.perf_counter()
+    added = skipped = 0
+    for offset in range(0, len(rows), args.batch_size):
+        batch, images = [], []
+        for row in rows[offset:offset + args.batch_size]:
+            if not store.ensure(row.image_path):
+                print(f"dilewati, file tidak ada: {row.image_path}")
+                skipped += 1
+                continue
+            with open(row.image_path, 'rb') as f:
+                images.append(IngestedImage(f.read(), max_side=Config.UPLOAD_MAX_SIDE,
+                                            max_pixels=Config.IMAGE_MAX_PIXELS))
+            batch.append(row)
+        if not batch:
+            continue
+
+        # Kunci sama dengan saat diunggah: hash byte asli dari nama file WebP
+        keys = [feature_key(image, stored_digest(row.image_path)) for row, image in zip(batch, images)]
+        features = [feature_cache.get(key) if feature_cache else None for key in keys]
+        missing = [i for i, grid in enumerate(features) if grid is None]
+        if missing:
+            extracted = extract_features(np.concatenate([images[i].model_tensor() for i in missing])).numpy()
+            for i, grid in zip(missing, extracted):
+                features[i] = grid
+                if feature_cache:
+                    feature_cache.put(keys[i], grid)
+        for row, grid in zip(batch, features):
+            index.add(row.user_id, row.id, pool_embedding(grid))
+        added += len(batch)
+        print(f"{added}/{len(rows)} gambar, {added / (time.perf_counter() - start):.1f} gambar/detik")
+
+    print(f"selesai: {added} ditambahkan, {skipped} dilewati")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Captioning massal satu direktori gambar di luar aplikasi web.
+
+Gambar di-decode dan diperkecil di pool proses, dikumpulkan menjadi batch berukuran
+tetap lewat antrian prefetch terbatas, lalu diproses model dalam batch. Hasil ditulis
+ke JSONL atau langsung ke tabel Images (bulk update/insert). Path yang berhasil diberi
+caption dicatat di file checkpoint sehingga proses yang terhenti dapat dilanjutkan;
+path yang gagal dicoba lagi pada run berikutnya. Thumbnail unggahan (<nama>_<sisi>.webp
+di samping <nama>.webp) dilewati.
+Jalankan dari root repo:
+
+    python tools/bulk_caption.py --source static/uploads --output captions.jsonl
+    python tools/bulk_caption.py --source static/uploads --db
+    python tools/bulk_caption.py --source arsip/ --db --user-id 1 --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from storage import is_thumbnail  # noqa: E402
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+def iter_images(source):
+    for root, _, filenames in os.walk(source):
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            if (os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS
+                    and not is_thumbnail(path, Config.UPLOAD_THUMBNAIL_SIZES)):
+                yield os.path.relpath(path)
+
+
+def decode_image(path, max_side, max_pixels):
+    # Dijalankan di proses pool: hanya PIL, tanpa TensorFlow
+    from ingest import IngestedImage
+
+    try:
+        with open(path, 'rb') as f:
+            image = IngestedImage(f.read(), filename=os.path.basename(path), max_side=max_side,
+                                  max_pixels=max_pixels)
+        return path, image.pixels, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+class Checkpoint:
+    """Daftar path yang sudah diberi caption, satu per baris, ditambahkan setelah setiap batch ditulis."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = {line.rstrip('\n') for line in f if line.strip()}
+
+    def mark(self, paths):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(f'{path}\n' for path in paths)
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(paths)
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.path = path
+
+    def pending(self, paths):
+        return paths
+
+    def write(self, records):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        pass
+
+
+class DatabaseWriter:
+    """Mengisi predicted_caption di tabel Images dengan bulk update per batch.
+
+    Baris dicocokkan lewat image_path. Gambar tanpa baris hanya disisipkan bila
+    user_id diberikan; baris yang sudah punya caption dilewati kecuali overwrite.
+    """
+
+    def __init__(self, user_id=None, overwrite=False):
+        from app import app
+
+        self.user_id = user_id
+        self.overwrite = overwrite
+        self._context = app.app_context()
+        self._context.push()
+
+        from models import Images
+
+        self.rows = {os.path.normpath(path): (image_id, caption) for image_id, path, caption in
+                     Images.query.with_entities(Images.id, Images.image_path, Images.predicted_caption)}
+
+    def pending(self, paths):
+        def needed(path):
+            row = self.rows.get(os.path.normpath(path))
+            if row is None:
+                return self.user_id is not None
+            return self.overwrite or not row[1]
+        return [path for path in paths if needed(path)]
+
+    def write(self, records):
+        from extensions import db
+        from models import Images
+
+        updates, inserts = [], []
+        for record in records:
+            if 'caption' not in record:
+                continue
+            row = self.rows.get(os.path.normpath(record['path']))
+            if row is not None:
+                updates.append({'id': row[0], 'predicted_caption': record['caption'], 'status': 'done'})
+            else:
+                inserts.append({'user_id': self.user_id, 'image_path': record['path'],
+                                'predicted_caption': record['caption'], 'status': 'done'})
+        if updates:
+            db.session.bulk_update_mappings(Images, updates)
+        if inserts:
+            db.session.bulk_insert_mappings(Images, inserts)
+        db.session.commit()
+
+    def close(self):
+        self._context.pop()
+
+
+def produce(paths, batches, args):
+    """Thread produsen: decode di pool proses dengan jendela terbatas, lalu masukkan batch ke antrian."""
+    try:
+        _produce(paths, batches, args)
+    except Exception as e:
+        print(f"Kesalahan saat decode: {str(e)}", file=sys.stderr)
+    finally:
+        batches.put(None)
+
+
+def _produce(paths, batches, args):
+    window = args.batch_size * (args.prefetch + 1)
+    # spawn: proses anak tidak mewarisi state TensorFlow dari proses induk
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as executor:
+        in_flight = deque()
+        batch = []
+        for path in paths:
+            in_flight.append(executor.submit(decode_image, path, args.max_side, Config.IMAGE_MAX_PIXELS))
+            while len(in_flight) >= window:
+                batch.append(in_flight.popleft().result())
+                if len(batch) == args.batch_size:
+                    batches.put(batch)
+                    batch = []
+        while in_flight:
+            batch.append(in_flight.popleft().result())
+            if len(batch) == args.batch_size:
+                batches.put(batch)
+                batch = []
+        if batch:
+            batches.put(batch)
+
+
+def caption_batch(batch):
+    from inference import caption_features, extract_features, preprocess_pixels
+
+    records = [{'path': path, 'error': error} for path, pixels, error in batch if error]
+    decoded = [(path, pixels) for path, pixels, error in batch if not error]
+    if decoded:
+        tensors = np.concatenate([preprocess_pixels(pixels) for _, pixels in decoded], axis=0)
+        captions = caption_features(extract_features(tensors).numpy(), repetition_ngram=Config.CAPTION_REPETITION_NGRAM,
+                                    end_threshold=Config.CAPTION_END_THRESHOLD)
+        for (path, _), caption in zip(decoded, captions):
+            records.append({'path': path, 'caption': ' '.join([word for word in caption if word != "<unk>"])})
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='static/uploads')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', help='file JSONL tujuan (ditambahkan, bukan ditimpa)')
+    target.add_argument('--db', action='store_true', help='tulis ke tabel Images')
+    parser.add_argument('--user-id', type=int, help='sisipkan baris baru untuk gambar yang belum ada di tabel')
+    parser.add_argument('--overwrite', action='store_true', help='isi ulang caption yang sudah ada')
+    parser.add_argument('--checkpoint', help='default: <output>.checkpoint atau instance/bulk_caption.checkpoint')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--prefetch', type=int, default=2, help='jumlah batch yang sudah di-decode di antrian')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-side', type=int, default=Config.CAPTION_DECODE_SIDE)
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or (f'{args.output}.checkpoint' if args.output
+                                          else os.path.join('instance', 'bulk_caption.checkpoint'))
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+    checkpoint = Checkpoint(checkpoint_path)
+    writer = JsonlWriter(args.output) if args.output else DatabaseWriter(args.user_id, args.overwrite)
+
+    paths = writer.pending([path for path in iter_images(args.source) if path not in checkpoint.done])
+    print(f"{len(paths)} gambar akan diproses ({len(checkpoint.done)} sudah ada di checkpoint)")
+
+    batches = queue.Queue(maxsize=args.prefetch)
+    producer = threading.Thread(target=produce, args=(paths, batches, args), daemon=True)
+    producer.start()
+
+    processed = failed = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            records = caption_batch(batch)
+            writer.write(records)
+            checkpoint.mark([record['path'] for record in records if 'caption' in record])
+            processed += len(records)
+            failed += sum('error' in record for record in records)
+            elapsed = time.perf_counter() - start
+            print(f"{processed}/{len(paths)} gambar, {failed} gagal, {processed / elapsed:.1f} gambar/detik",
+                  flush=True)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Selesai: {processed} gambar dalam {elapsed:.1f} detik "
+          f"({processed / elapsed if elapsed else 0:.1f} gambar/detik), {failed} gagal")
+
+
+if __name__ == '__main__':
+    main()
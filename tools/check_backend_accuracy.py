@@ -0,0 +1,100 @@
+"""Membandingkan caption backend inferensi terkompilasi dengan jalur eager pada satu set gambar tetap.
+
+Melaporkan kecocokan caption persis, kecocokan token, selisih fitur maksimum dan
+latensi per gambar untuk tiap backend. Jalankan dari root repo:
+
+    python tools/check_backend_accuracy.py --backend tflite --quantization float16
+    python tools/check_backend_accuracy.py --backend graph --images static/images
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from ingest import IngestedImage  # noqa: E402
+from inference import beam_search, sequence_to_words  # noqa: E402
+from model_registry import ModelRegistry  # noqa: E402
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+def iter_images(source):
+    for root, _, filenames in os.walk(source):
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.join(root, filename)
+
+
+def caption_all(registry, tensors, beam_width):
+    backend = registry.backend
+    registry.warm_up()
+    captions, features, timings = [], [], []
+    for tensor in tensors:
+        start = time.perf_counter()
+        image_features = backend.extract_features(tensor)
+        sequences, _, _ = beam_search(image_features, beam_width, backend=backend)
+        timings.append(time.perf_counter() - start)
+        captions.append(sequence_to_words(sequences[0, 0].numpy().tolist()))
+        features.append(np.asarray(image_features))
+    return captions, features, timings
+
+
+def token_agreement(reference, candidate):
+    length = max(len(reference), len(candidate))
+    if length == 0:
+        return 1.0
+    return sum(a == b for a, b in zip(reference, candidate)) / length
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='tflite', choices=['graph', 'tflite'])
+    parser.add_argument('--quantization', default=Config.TFLITE_QUANTIZATION)
+    parser.add_argument('--tflite-dir', default=Config.TFLITE_MODEL_DIR)
+    parser.add_argument('--images', default='static/images')
+    parser.add_argument('--beam-width', type=int, default=3)
+    parser.add_argument('--min-match', type=float, default=0.0,
+                        help='keluar dengan status 1 bila kecocokan caption persis di bawah nilai ini')
+    args = parser.parse_args()
+
+    paths = list(iter_images(args.images))
+    if not paths:
+        parser.error(f"Tidak ada gambar di {args.images}")
+    tensors = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            tensors.append(IngestedImage(f.read(), max_side=Config.CAPTION_DECODE_SIDE).model_tensor())
+
+    eager = ModelRegistry(backend='eager')
+    candidate = ModelRegistry(backend=args.backend, tflite_dir=args.tflite_dir,
+                              tflite_quantization=args.quantization, tflite_threads=Config.TFLITE_NUM_THREADS)
+    reference_captions, reference_features, eager_timings = caption_all(eager, tensors, args.beam_width)
+    candidate_captions, candidate_features, candidate_timings = caption_all(candidate, tensors, args.beam_width)
+
+    exact = 0
+    agreements = []
+    for path, reference, result in zip(paths, reference_captions, candidate_captions):
+        exact += reference == result
+        agreements.append(token_agreement(reference, result))
+        if reference != result:
+            print(f"BEDA {path}\n  eager  : {' '.join(reference)}\n  {args.backend:<7}: {' '.join(result)}")
+
+    feature_error = max(float(np.max(np.abs(a - b))) for a, b in zip(reference_features, candidate_features))
+    match = exact / len(paths)
+    print(f"{len(paths)} gambar, caption sama persis: {match:.1%}, kecocokan token: "
+          f"{statistics.mean(agreements):.1%}, selisih fitur maks: {feature_error:.4g}")
+    print(f"latensi median eager: {statistics.median(eager_timings) * 1000:.0f} ms, "
+          f"{args.backend}: {statistics.median(candidate_timings) * 1000:.0f} ms")
+
+    if match < args.min_match:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Menghapus file di folder unggahan yang tidak lagi dirujuk tabel Images.
+
+Termasuk file asli bernama UUID dari versi lama yang tidak pernah dihapus, WebP
+yang barisnya sudah hilang, thumbnail yatim dan sisa encode (*.src, *.tmp).
+File yang lebih muda dari --min-age-hours dilewati agar unggahan yang sedang
+berlangsung tidak ikut terhapus. Jalankan dari root repo:
+
+    python tools/clean_uploads.py --dry-run
+    python tools/clean_uploads.py --min-age-hours 48
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from storage import thumbnail_path  # noqa: E402
+
+
+def referenced_paths(thumbnail_sizes):
+    from app import app
+    from models import Images
+
+    with app.app_context():
+        paths = set()
+        for (image_path,) in Images.query.with_entities(Images.image_path):
+            paths.add(os.path.normpath(image_path))
+            paths.update(os.path.normpath(thumbnail_path(image_path, size)) for size in thumbnail_sizes)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--folder', default=Config.UPLOAD_FOLDER)
+    parser.add_argument('--min-age-hours', type=float, default=24)
+    parser.add_argument('--dry-run', action='store_true', help='hanya tampilkan file yang akan dihapus')
+    args = parser.parse_args()
+
+    referenced = referenced_paths(Config.UPLOAD_THUMBNAIL_SIZES)
+    cutoff = time.time() - args.min_age_hours * 3600
+    removed = freed = 0
+    for root, _, filenames in os.walk(args.folder):
+        for filename in filenames:
+            path = os.path.normpath(os.path.join(root, filename))
+            if path in referenced or os.path.getmtime(path) > cutoff:
+                continue
+            size = os.path.getsize(path)
+            print(f"{'akan dihapus' if args.dry_run else 'dihapus'}: {path} ({size / 1024:.0f} KB)")
+            if not args.dry_run:
+                os.remove(path)
+            removed += 1
+            freed += size
+
+    print(f"{removed} file, {freed / 1e6:.1f} MB {'dapat dibebaskan' if args.dry_run else 'dibebaskan'}")
+
+
+if __name__ == '__main__':
+    main()
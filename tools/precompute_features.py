@@ -0,0 +1,91 @@
+"""Menghitung grid fitur ResNet50V2 untuk semua gambar di sebuah direktori secara batch.
+
+Fitur disimpan ke cache fitur (FEATURE_CACHE_DIR) dengan kunci hash isi file dan
+sisi decode (--max-side), di subdirektori INFERENCE_BACKEND, sehingga captioning ulang
+gambar yang sama dengan sisi decode yang sama melewati ResNet50V2. WebP unggahan
+(<sha256>.webp) dikunci dengan hash byte asli di namanya, sama seperti saat diunggah,
+walaupun grid-nya dihitung dari WebP tersimpan; thumbnail unggahan dilewati.
+Jalankan dari root repo:
+
+    python tools/precompute_features.py --source static/uploads --batch-size 16
+    python tools/precompute_features.py --source incoming/ --max-side 448
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from feature_cache import FeatureCache, feature_key  # noqa: E402
+from inference import extract_features  # noqa: E402
+from ingest import IngestedImage  # noqa: E402
+from storage import is_thumbnail, stored_digest  # noqa: E402
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+def iter_images(source):
+    for root, _, filenames in os.walk(source):
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            if (os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS
+                    and not is_thumbnail(path, Config.UPLOAD_THUMBNAIL_SIZES)):
+                yield path
+
+
+def flush(cache, keys, tensors):
+    features = extract_features(np.concatenate(tensors, axis=0)).numpy()
+    for key, image_features in zip(keys, features):
+        cache.put(key, image_features)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='static/uploads')
+    parser.add_argument('--cache-dir', default=Config.FEATURE_CACHE_DIR or 'instance/features')
+    parser.add_argument('--dtype', default=Config.FEATURE_CACHE_DTYPE)
+    parser.add_argument('--max-side', type=int, default=Config.UPLOAD_MAX_SIDE,
+                        help='sisi decode: UPLOAD_MAX_SIDE untuk unggahan, CAPTION_DECODE_SIDE untuk /captioning')
+    parser.add_argument('--batch-size', type=int, default=16)
+    args = parser.parse_args()
+
+    cache = FeatureCache(args.cache_dir, args.dtype, Config.INFERENCE_BACKEND)
+    keys, tensors = [], []
+    processed = skipped = failed = 0
+    start = time.perf_counter()
+
+    for path in iter_images(args.source):
+        with open(path, 'rb') as f:
+            image = IngestedImage(f.read(), max_side=args.max_side, max_pixels=Config.IMAGE_MAX_PIXELS)
+        key = feature_key(image, stored_digest(path))
+        if key in cache or key in keys:
+            skipped += 1
+            continue
+        try:
+            tensors.append(image.model_tensor())
+        except Exception as e:
+            print(f"Lewati {path}: {str(e)}", file=sys.stderr)
+            failed += 1
+            continue
+        keys.append(key)
+
+        if len(keys) == args.batch_size:
+            flush(cache, keys, tensors)
+            processed += len(keys)
+            keys, tensors = [], []
+
+    if keys:
+        flush(cache, keys, tensors)
+        processed += len(keys)
+
+    elapsed = time.perf_counter() - start
+    print(f"{processed} gambar diproses, {skipped} sudah ada di cache, {failed} gagal "
+          f"({processed / elapsed if elapsed else 0:.1f} gambar/detik)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Server tiruan untuk layanan eksternal (koreksi caption, uploader, Gemini).
+
+Berguna untuk menguji latensi tahap pengayaan tanpa koneksi internet. Jalankan:
+
+    python tools/stub_upstream.py --port 8001 --latency-ms 300
+
+lalu arahkan aplikasi ke server ini:
+
+    NYXS_API_URL=http://127.0.0.1:8001
+    UPLOADER_URL=http://127.0.0.1:8001/upload
+"""
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    upload_latency = 0.0
+    gemini_latency = 0.0
+
+    def _send(self, status, body, content_type):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == '/ai/gpt4':
+            time.sleep(self.latency)
+            text = params.get('text', [''])[0]
+            caption = text.split(':', 1)[-1].strip().strip('"')
+            self._send(200, json.dumps({'result': caption.capitalize() + '.'}), 'application/json')
+        elif url.path == '/ai/gemini-img':
+            time.sleep(self.gemini_latency)
+            self._send(200, json.dumps({'result': f"Deskripsi tiruan untuk {params.get('url', [''])[0]}"}),
+                       'application/json')
+        else:
+            self._send(404, 'not found', 'text/plain')
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/upload':
+            self._send(404, 'not found', 'text/plain')
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        time.sleep(self.upload_latency)
+        host = self.headers.get('Host', '127.0.0.1')
+        self._send(200, f'<html><body><a href="http://{host}/files/{uuid.uuid4()}.jpg">file</a></body></html>',
+                   'text/html')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=0, help='latensi koreksi caption')
+    parser.add_argument('--upload-latency-ms', type=float, default=None, help='default: sama dengan --latency-ms')
+    parser.add_argument('--gemini-latency-ms', type=float, default=None, help='default: sama dengan --latency-ms')
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency_ms / 1000
+    StubHandler.upload_latency = (args.latency_ms if args.upload_latency_ms is None else args.upload_latency_ms) / 1000
+    StubHandler.gemini_latency = (args.latency_ms if args.gemini_latency_ms is None else args.gemini_latency_ms) / 1000
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Server tiruan berjalan di http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()